@@ -3,6 +3,79 @@ import random
 import math
 import time
 
+import numpy as np
+
+from tracing import tracer
+
+class MessageAtlas:
+    """Pre-rendered plane messages with their glow already composited
+
+    Every (text, colour, font size, glow spread) combination is rendered once
+    at full brightness. Depth and per-message brightness are applied at blit
+    time as surface alpha, so each message costs a single blit however often
+    its text changes.
+    """
+    
+    LIMIT = 4000
+    GLOW_OFFSETS = [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+    
+    def __init__(self):
+        self.fonts = {}
+        self.sprites = {}
+    
+    def get_font(self, font_size):
+        font = self.fonts.get(font_size)
+        if font is None:
+            try:
+                font = pygame.font.Font(None, font_size)
+            except:
+                return None
+            self.fonts[font_size] = font
+        return font
+    
+    def get(self, text, color, font_size, glow_spread):
+        # Returns (sprite, anchor) where anchor is the text centre inside the sprite
+        key = (text, color, font_size, glow_spread)
+        entry = self.sprites.get(key)
+        if entry is None:
+            if len(self.sprites) >= self.LIMIT:
+                self.sprites.clear()
+            entry = self._build(text, color, font_size, glow_spread)
+            self.sprites[key] = entry
+        return entry
+    
+    def _build(self, text, color, font_size, glow_spread):
+        font = self.get_font(font_size)
+        if font is None:
+            return None
+        
+        r, g, b = color
+        glow_color = (int(r * 0.3), int(g * 0.3), int(b * 0.3))
+        # copy() repacks padded font surfaces, which premul_alpha mishandles
+        glow_text = font.render(text, True, glow_color).copy().premul_alpha()
+        main_text = font.render(text, True, color).copy().premul_alpha()
+        
+        text_width, text_height = main_text.get_size()
+        sprite = pygame.Surface((text_width + 2 * glow_spread, text_height + 2 * glow_spread), pygame.SRCALPHA)
+        
+        # Composite in premultiplied space so overlapping glow and text blend correctly
+        for ox, oy in self.GLOW_OFFSETS:
+            sprite.blit(glow_text, (glow_spread + ox * glow_spread, glow_spread + oy * glow_spread), special_flags=pygame.BLEND_PREMULTIPLIED)
+        sprite.blit(main_text, (glow_spread, glow_spread), special_flags=pygame.BLEND_PREMULTIPLIED)
+        
+        # Back to straight alpha so surface alpha can fade the whole message per blit
+        alpha = pygame.surfarray.pixels_alpha(sprite)
+        rgb = pygame.surfarray.pixels3d(sprite)
+        covered = alpha > 0
+        for channel in range(3):
+            plane = rgb[..., channel]
+            plane[covered] = np.minimum(255, plane[covered].astype(np.uint16) * 255 // alpha[covered])
+        del alpha, rgb
+        
+        anchor = (glow_spread + text_width // 2, glow_spread + text_height // 2)
+        return sprite, anchor
+
+
 class DataPlane:
     """A single data plane - a wireframe rectangle with error messages"""
     
@@ -28,27 +101,23 @@ class DataPlane:
         "CORE DUMPED"
     ]
     
-    def __init__(self, z_depth, width, height):
-        self.z = z_depth
-        self.width = width
-        self.height = height
-        
-        self.corners = [
-            (-width/2, -height/2, z_depth),  # Bottom-left
-            (width/2, -height/2, z_depth),   # Bottom-right
-            (width/2, height/2, z_depth),    # Top-right
-            (-width/2, height/2, z_depth)    # Top-left
-        ]
+    # Message sprites shared by every plane and viewport
+    atlas = MessageAtlas()
+    
+    COLORS = [(0, 255, 255), (255, 0, 255), (255, 255, 0)]
+    
+    def __init__(self, z_depth, width, height, rng=random):
+        self._init_geometry(z_depth, width, height)
         
         # Generate error messages scattered across the plane
         self.messages = []
-        num_messages = random.randint(5, 10)
+        num_messages = rng.randint(5, 10)
         for _ in range(num_messages):
-            x = random.uniform(-width/2 + 0.5, width/2 - 0.5)
-            y = random.uniform(-height/2 + 0.5, height/2 - 0.5)
-            msg = random.choice(self.ERROR_MESSAGES)
+            x = rng.uniform(-width/2 + 0.5, width/2 - 0.5)
+            y = rng.uniform(-height/2 + 0.5, height/2 - 0.5)
+            msg = rng.choice(self.ERROR_MESSAGES)
             
-            color_choice = random.choice(['cyan', 'magenta', 'yellow'])
+            color_choice = rng.choice(['cyan', 'magenta', 'yellow'])
             if color_choice == 'cyan':
                 color = (0, 255, 255)
             elif color_choice == 'magenta':
@@ -56,24 +125,76 @@ class DataPlane:
             else:
                 color = (255, 255, 0)
             
-            brightness = random.uniform(0.5, 1.0)
+            brightness = rng.uniform(0.5, 1.0)
             self.messages.append({
                 'pos': (x, y, z_depth),
                 'text': msg,
                 'color': color,
                 'brightness': brightness,
-                'change_timer': random.randint(60, 180),
+                'change_timer': rng.randint(60, 180),
                 'glitch_timer': 0,
                 'glitch_offset': 0
             })
         
-        self.frame_color_time = random.uniform(0, math.pi * 2)
+        self.frame_color_time = rng.uniform(0, math.pi * 2)
         self.frame_color_speed = 0.05
         
         # Pulsing effect
-        self.pulse_offset = random.uniform(0, math.pi * 2)
-        self.pulse_speed = random.uniform(0.03, 0.06)
+        self.pulse_offset = rng.uniform(0, math.pi * 2)
+        self.pulse_speed = rng.uniform(0.03, 0.06)
         self.pulse_time = 0
+    
+    def _init_geometry(self, z_depth, width, height):
+        self.z = z_depth
+        self.width = width
+        self.height = height
+        
+        self.corners = [
+            (-width/2, -height/2, z_depth),  # Bottom-left
+            (width/2, -height/2, z_depth),   # Bottom-right
+            (width/2, height/2, z_depth),    # Top-right
+            (-width/2, height/2, z_depth)    # Top-left
+        ]
+    
+    def to_spec(self):
+        # Compact, picklable form for building planes in worker processes
+        messages = tuple(
+            (msg['pos'][0], msg['pos'][1], msg['text'], msg['color'], msg['brightness'], msg['change_timer'])
+            for msg in self.messages
+        )
+        return (self.z, self.width, self.height, messages,
+                self.frame_color_time, self.pulse_offset, self.pulse_speed)
+    
+    @classmethod
+    def from_spec(cls, spec):
+        z_depth, width, height, messages, frame_color_time, pulse_offset, pulse_speed = spec
+        plane = cls.__new__(cls)
+        plane._init_geometry(z_depth, width, height)
+        plane.messages = [
+            {
+                'pos': (x, y, z_depth),
+                'text': text,
+                'color': color,
+                'brightness': brightness,
+                'change_timer': change_timer,
+                'glitch_timer': 0,
+                'glitch_offset': 0
+            }
+            for x, y, text, color, brightness, change_timer in messages
+        ]
+        plane.frame_color_time = frame_color_time
+        plane.frame_color_speed = 0.05
+        plane.pulse_offset = pulse_offset
+        plane.pulse_speed = pulse_speed
+        plane.pulse_time = 0
+        return plane
+    
+    def message_font_size(self, render_scale=1.0):
+        z_normalized = (self.z - 0) / (40 - 0)
+        z_normalized = max(0.0, min(1.0, z_normalized))
+        scale_factor = 1.0 / (1.0 + z_normalized * 2.0)
+        font_size = int(20 * scale_factor * render_scale)
+        return max(max(4, int(8 * render_scale)), min(int(36 * render_scale), font_size))
         
     def update(self):
         # Update animations
@@ -114,10 +235,20 @@ class DataPlane:
         
         return (r, g, b)
     
-    def render(self, screen, project_func, hx, hy, width, height):
-        # Render the data plane with wireframe and error messages
-        
+    def snapshot(self):
+        # Animation state needed by render, detached from the live plane
         pulse_factor = 1.0 + 0.3 * math.sin(self.pulse_time + self.pulse_offset)
+        messages = [
+            (msg['pos'], msg['text'], msg['color'], msg['brightness'], msg['glitch_offset'])
+            for msg in self.messages
+        ]
+        return pulse_factor, self._get_frame_color(), messages
+    
+    def render(self, screen, project_func, hx, hy, width, height, state=None, render_scale=1.0):
+        # Render the data plane with wireframe and error messages
+        if state is None:
+            state = self.snapshot()
+        pulse_factor, frame_base_color, messages = state
         
         base_alpha = self._calculate_depth_alpha(self.z)
         alpha = base_alpha * pulse_factor
@@ -134,7 +265,6 @@ class DataPlane:
                 return
         
         # Get frame color
-        frame_base_color = self._get_frame_color()
         r, g, b = frame_base_color
         frame_color = (int(r * alpha), int(g * alpha), int(b * alpha))
         
@@ -147,71 +277,81 @@ class DataPlane:
                 for thickness, glow_mult in [(6, 0.2), (4, 0.4)]:
                     glow_alpha = alpha * glow_mult
                     glow_color = (int(r * glow_alpha), int(g * glow_alpha), int(b * glow_alpha))
-                    pygame.draw.line(screen, glow_color, p1, p2, thickness)
+                    pygame.draw.line(screen, glow_color, p1, p2, max(1, round(thickness * render_scale)))
 
-                pygame.draw.line(screen, frame_color, p1, p2, 2)
+                pygame.draw.line(screen, frame_color, p1, p2, max(1, round(2 * render_scale)))
             except:
                 pass
         
         # Render error messages
-        self._render_messages(screen, project_func, hx, hy, width, height, base_alpha)
+        self._render_messages(screen, project_func, hx, hy, width, height, base_alpha, messages, render_scale)
     
-    def _render_messages(self, screen, project_func, hx, hy, width, height, base_alpha):
+    def _render_messages(self, screen, project_func, hx, hy, width, height, base_alpha, messages, render_scale):
         # Render error messages on the plane surface
+        font_size = self.message_font_size(render_scale)
+        glow_spread = max(1, round(2 * render_scale))
         
-        z_normalized = (self.z - 0) / (40 - 0)
-        z_normalized = max(0.0, min(1.0, z_normalized))
-        scale_factor = 1.0 / (1.0 + z_normalized * 2.0)
-        font_size = int(20 * scale_factor)
-        font_size = max(8, min(36, font_size))
-        
-        try:
-            font = pygame.font.Font(None, font_size)
-        except:
-            return
-        
-        for msg in self.messages:
-            pos = msg['pos']
-            text = msg['text']
-            color = msg['color']
-            brightness = msg['brightness']
-            glitch_offset = msg['glitch_offset']
-            
+        for pos, text, color, brightness, glitch_offset in messages:
             try:
                 px, py = project_func(*pos, hx, hy, width, height)
-                px += glitch_offset
+                px += glitch_offset * render_scale
             except:
                 continue
             
             if px < -100 or px > width + 100 or py < -100 or py > height + 100:
                 continue
             
-            # Calculate final color with depth and brightness
+            # Calculate final alpha with depth and brightness
             final_alpha = base_alpha * brightness
-            r, g, b = color
-            text_color = (int(r * final_alpha), int(g * final_alpha), int(b * final_alpha))
             
-            # Render with glow
+            # Pre-rendered text and glow, faded at blit time
             try:
-                glow_color = (int(r * final_alpha * 0.3), int(g * final_alpha * 0.3), int(b * final_alpha * 0.3))
-                for ox, oy in [(-1, -1), (1, -1), (-1, 1), (1, 1)]:
-                    glow_surface = font.render(text, True, glow_color)
-                    glow_rect = glow_surface.get_rect(center=(px + ox*2, py + oy*2))
-                    screen.blit(glow_surface, glow_rect)
-                
-                text_surface = font.render(text, True, text_color)
-                text_rect = text_surface.get_rect(center=(px, py))
-                screen.blit(text_surface, text_rect)
+                entry = self.atlas.get(text, color, font_size, glow_spread)
+                if entry is None:
+                    return
+                sprite, (anchor_x, anchor_y) = entry
+                sprite.set_alpha(int(255 * min(1.0, final_alpha)))
+                screen.blit(sprite, (int(px) - anchor_x, int(py) - anchor_y))
             except:
                 pass
 
 
+PLANE_JOB_SIZE = 5
+
+def plane_jobs(num_planes, bounds):
+    # Depths for every plane, split into independent, seeded jobs
+    min_x, max_x, min_y, max_y, min_z, max_z = bounds
+    
+    depth_step = (max_z - min_z) / (num_planes + 1)
+    depths = [min_z + depth_step * (i + 1) for i in range(num_planes)]
+    
+    # Full size planes
+    plane_width = (max_x - min_x) * 0.95
+    plane_height = (max_y - min_y) * 0.95
+    
+    return [
+        (depths[i:i + PLANE_JOB_SIZE], plane_width, plane_height, random.getrandbits(32))
+        for i in range(0, num_planes, PLANE_JOB_SIZE)
+    ]
+
+def build_plane_specs(job):
+    # Runs in a worker: builds planes at the given depths and returns them in compact form
+    depths, plane_width, plane_height, seed = job
+    rng = random.Random(seed)
+    return [DataPlane(z, plane_width, plane_height, rng).to_spec() for z in depths]
+
+
 class DataPlaneSystem:
     # Manages multiple data planes at different depths
     
-    def __init__(self, num_planes=25, bounds=(-10, 10, -8, 8, 0, 40)):
+    def __init__(self, num_planes=25, bounds=(-10, 10, -8, 8, 0, 40), builder=None):
         self.bounds = bounds
         self.num_planes = num_planes
+        self.builder = builder
+        
+        # Offscreen render resolution relative to the display; line widths and text scale with it
+        self.render_scale = 1.0
+        
         self.planes = []
         self._init_planes()
         self._init_longitudinal_lines()
@@ -282,25 +422,41 @@ class DataPlaneSystem:
         return None, None
     
     def _init_planes(self):
-        # Create planes at evenly spaced depths
-        min_x, max_x, min_y, max_y, min_z, max_z = self.bounds
+        # Create planes at evenly spaced depths, in independent jobs
+        jobs = plane_jobs(self.num_planes, self.bounds)
         
-        self.planes = []
+        if self.builder is not None:
+            results = self.builder.map(build_plane_specs, jobs)
+        else:
+            results = map(build_plane_specs, jobs)
         
-        depth_step = (max_z - min_z) / (self.num_planes + 1)
-        
-        for i in range(self.num_planes):
-            z = min_z + depth_step * (i + 1)
-            
-            # Full size planes
-            plane_width = (max_x - min_x) * 0.95
-            plane_height = (max_y - min_y) * 0.95
-            
-            plane = DataPlane(z, plane_width, plane_height)
-            self.planes.append(plane)
+        planes = [DataPlane.from_spec(spec) for specs in results for spec in specs]
         
         # Sort by depth (far to near)
-        self.planes.sort(key=lambda p: p.z, reverse=True)
+        planes.sort(key=lambda p: p.z, reverse=True)
+        self.planes = planes
+    
+    def prewarm_atlas(self):
+        # Render every message sprite these planes can show at the current render scale, one job per
+        # font size. Call from the render thread, before the simulation starts: the jobs use the shared fonts.
+        atlas = DataPlane.atlas
+        glow_spread = max(1, round(2 * self.render_scale))
+        font_sizes = sorted({plane.message_font_size(self.render_scale) for plane in self.planes})
+        
+        # Fonts are created up front; each job then renders with its own font only
+        for font_size in font_sizes:
+            atlas.get_font(font_size)
+        
+        def prewarm_size(font_size):
+            for text in DataPlane.ERROR_MESSAGES:
+                for color in DataPlane.COLORS:
+                    atlas.get(text, color, font_size, glow_spread)
+        
+        if self.builder is not None:
+            self.builder.map_threads(prewarm_size, font_sizes)
+        else:
+            for font_size in font_sizes:
+                prewarm_size(font_size)
     
     def update_bounds(self, new_bounds):
         # Update bounds and reinitialise planes if needed
@@ -324,18 +480,28 @@ class DataPlaneSystem:
         for plane in self.planes:
             plane.update()
     
-    def render(self, screen, project_func, hx, hy, width, height):
+    def snapshot(self):
+        # Planes and lines are replaced rather than mutated on resize, so references are safe to keep
+        planes = [(plane, plane.snapshot()) for plane in self.planes]
+        return planes, self.longitudinal_lines, self.bounds
+    
+    def render(self, screen, project_func, hx, hy, width, height, state=None):
         # Render all planes and longitudinal lines in depth order
+        if state is None:
+            state = self.snapshot()
+        planes, longitudinal_lines, bounds = state
         
-        self._render_longitudinal_lines(screen, project_func, hx, hy, width, height)
+        with tracer.span('planes.longitudinal_lines'):
+            self._render_longitudinal_lines(screen, project_func, hx, hy, width, height, longitudinal_lines, bounds)
         
-        for plane in self.planes:
-            plane.render(screen, project_func, hx, hy, width, height)
+        with tracer.span('planes.planes', planes=len(planes)):
+            for plane, plane_state in planes:
+                plane.render(screen, project_func, hx, hy, width, height, plane_state, self.render_scale)
     
-    def _render_longitudinal_lines(self, screen, project_func, hx, hy, width, height):
+    def _render_longitudinal_lines(self, screen, project_func, hx, hy, width, height, longitudinal_lines, bounds):
         # Render the longitudinal corner lines with depth-based fading
         
-        for line_data in self.longitudinal_lines:
+        for line_data in longitudinal_lines:
             start_3d = line_data['start']
             end_3d = line_data['end']
             line_type = line_data['type']
@@ -347,7 +513,7 @@ class DataPlaneSystem:
                 continue
             
             # Draw in segments for smooth depth fading
-            min_z, max_z = self.bounds[4], self.bounds[5]
+            min_z, max_z = bounds[4], bounds[5]
             num_segments = 40
             
             # Different alpha multipliers for different line types
@@ -359,6 +525,8 @@ class DataPlaneSystem:
                 alpha_multiplier = 0.85 
                 thickness_main = 1
                 thickness_glow = 2
+            thickness_main = max(1, round(thickness_main * self.render_scale))
+            thickness_glow = max(1, round(thickness_glow * self.render_scale))
             
             for i in range(num_segments):
                 z1 = min_z + (i / num_segments) * (max_z - min_z)
@@ -0,0 +1,310 @@
+import struct
+import subprocess
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from queue import Queue, Full
+
+import numpy as np
+
+from latency import now
+
+# Segment layout: a header, then `slots` fixed-size slots, each a header followed by pixels.
+# header:      magic, version, slots, slot header size, slot capacity in bytes, frames written
+# slot header: sequence, frame index, timestamp, width, height, pitch, pixel format
+HEADER = struct.Struct('<4sIIIQQ')
+SLOT_HEADER = struct.Struct('<QQdIII4s')
+MAGIC = b'CPFB'
+VERSION = 1
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 64
+FRAMES_WRITTEN_OFFSET = 24
+
+# ffmpeg names for the byte orders a 32-bit display surface can have
+FFMPEG_PIXEL_FORMATS = {'BGRX': 'bgr0', 'BGRA': 'bgra', 'RGBX': 'rgb0', 'RGBA': 'rgba', 'XRGB': '0rgb', 'ARGB': 'argb'}
+
+def pixel_format(surface):
+    # Channel order of a 32-bit surface, byte by byte as it sits in memory
+    channels = ['X'] * 4
+    for name, mask, shift in zip('RGBA', surface.get_masks(), surface.get_shifts()):
+        if mask:
+            channels[shift // 8] = name
+    return ''.join(channels)
+
+# Buffers created by FrameOutput in this process, which a reader here must leave registered
+_created_here = set()
+
+def _slot_offset(slot, capacity):
+    return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + capacity)
+
+def _is_stale(name, wait):
+    # True for one of our buffers whose writer has stopped publishing frames
+    try:
+        reader = SharedFrameReader(name)
+    except ValueError:
+        return False
+    try:
+        written = reader.frames_written()
+        time.sleep(wait)
+        return reader.frames_written() == written
+    finally:
+        reader.close()
+
+
+class FrameOutput:
+    """Publishes every presented frame to a shared-memory ring buffer
+
+    Each frame is copied straight from the surface's pixel buffer into the
+    oldest of `slots` slots, one memcpy and no intermediate surfaces. Each
+    slot is guarded by a sequence counter that is odd while the slot is
+    being written, so readers can detect a frame that was overwritten under
+    them (seqlock). The writer never waits: consumers that fall more than
+    `slots` frames behind simply miss frames. Frames larger than the
+    capacity chosen at startup are counted and skipped.
+    """
+
+    # Seconds an existing buffer's frame counter must stand still before it counts as abandoned
+    STALE_AFTER = 0.5
+
+    def __init__(self, name, max_size, slots=4, encoder=None):
+        self.name = name
+        self.slots = slots
+        self.capacity = max_size[0] * max_size[1] * 4
+        self.encoder = encoder
+
+        size = HEADER_SIZE + slots * (SLOT_HEADER_SIZE + self.capacity)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Only reclaim a buffer left behind by a run that didn't exit cleanly
+            if not _is_stale(name, self.STALE_AFTER):
+                raise FileExistsError(
+                    f"Shared memory '{name}' is in use by another portal or isn't a frame buffer; "
+                    f"stop that instance or choose another FRAME_OUTPUT_NAME"
+                )
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        _created_here.add(name)
+        self.buf = self.shm.buf
+        self.pixels = np.ndarray((size,), dtype=np.uint8, buffer=self.buf)
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, slots, SLOT_HEADER_SIZE, self.capacity, 0)
+
+        self.frames_written = 0
+        self.frames_too_large = 0
+        self.frames_unsupported = 0
+        self.sequences = [0] * slots
+
+    def write(self, surface, frame_index):
+        width, height = surface.get_size()
+        pitch = surface.get_pitch()
+        length = pitch * height
+        if surface.get_bytesize() != 4:
+            self.frames_unsupported += 1
+            return
+        if length > self.capacity:
+            self.frames_too_large += 1
+            return
+
+        slot = self.frames_written % self.slots
+        offset = _slot_offset(slot, self.capacity)
+        data_offset = offset + SLOT_HEADER_SIZE
+
+        # Odd sequence: readers treat the slot as being written
+        sequence = self.sequences[slot] + 1
+        struct.pack_into('<Q', self.buf, offset, sequence)
+
+        source = surface.get_buffer()
+        self.pixels[data_offset:data_offset + length] = np.frombuffer(source, dtype=np.uint8)
+        del source
+
+        SLOT_HEADER.pack_into(
+            self.buf, offset, sequence + 1, frame_index, now(),
+            width, height, pitch, pixel_format(surface).encode()
+        )
+        self.sequences[slot] = sequence + 1
+
+        self.frames_written += 1
+        struct.pack_into('<Q', self.buf, FRAMES_WRITTEN_OFFSET, self.frames_written)
+
+        if self.encoder is not None:
+            self.encoder.submit(self, slot, sequence + 1)
+
+    def close(self):
+        if self.encoder is not None:
+            self.encoder.close()
+        del self.pixels
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+        _created_here.discard(self.name)
+
+    def report(self):
+        line = f"Frame output: {self.frames_written} frames to shared memory '{self.name}'"
+        if self.frames_too_large:
+            line += f", {self.frames_too_large} skipped as larger than the buffer"
+        if self.frames_unsupported:
+            line += f", {self.frames_unsupported} skipped as not 32 bits per pixel"
+        if self.encoder is not None:
+            line += f"\n  {self.encoder.report()}"
+        return line
+
+
+class EncoderWriter:
+    """Pipes raw frames from the ring buffer into an encoder process's stdin
+
+    The render loop only hands over a slot and its sequence number, through a
+    bounded queue with put_nowait; if the encoder falls behind, frames are
+    dropped instead of stalling the frame. A thread copies each slot out,
+    discards it if it was overwritten meanwhile, strips row padding and
+    writes it to the process. The command may contain {width}, {height} and
+    {pix_fmt}, filled in from the first frame; frames of another size are
+    dropped.
+    """
+
+    def __init__(self, command, queue_size=4):
+        self.command = command
+        self.queue = Queue(maxsize=queue_size)
+        self.process = None
+        self.size = None
+
+        self.frames_encoded = 0
+        self.frames_dropped = 0
+
+        self.thread = threading.Thread(target=self._run, name='frame-encoder', daemon=True)
+        self.thread.start()
+
+    def submit(self, output, slot, sequence):
+        try:
+            self.queue.put_nowait((output, slot, sequence))
+        except Full:
+            self.frames_dropped += 1
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            output, slot, sequence = item
+
+            frame = read_slot(output.buf, slot, output.capacity, sequence)
+            if frame is None:
+                self.frames_dropped += 1
+                continue
+            _, _, pixels, fmt = frame
+
+            height, width = pixels.shape[:2]
+            if self.process is None:
+                try:
+                    self._start(width, height, fmt)
+                except OSError as e:
+                    print(f"Could not start frame encoder: {e}")
+                    return
+            if (width, height) != self.size:
+                self.frames_dropped += 1
+                continue
+
+            try:
+                self.process.stdin.write(pixels.data)
+            except (BrokenPipeError, OSError):
+                print("Frame encoder exited; no longer encoding")
+                return
+            self.frames_encoded += 1
+
+    def _start(self, width, height, fmt):
+        values = {'width': width, 'height': height, 'pix_fmt': FFMPEG_PIXEL_FORMATS.get(fmt, 'bgr0')}
+        command = [part.format(**values) for part in self.command]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.size = (width, height)
+
+    def close(self):
+        # Let queued frames finish, then close stdin so the encoder can finalise its file
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except:
+                pass
+            self.process.wait()
+
+    def report(self):
+        return f"Encoder: {self.frames_encoded} frames encoded, {self.frames_dropped} dropped"
+
+
+def read_slot(buf, slot, capacity, expected_sequence=None):
+    # Seqlock read: (frame index, timestamp, pixels, format), or None if the slot is empty or changed underneath
+    offset = _slot_offset(slot, capacity)
+    sequence, frame_index, timestamp, width, height, pitch, fmt = SLOT_HEADER.unpack_from(buf, offset)
+    if sequence == 0 or sequence % 2 or (expected_sequence is not None and sequence != expected_sequence):
+        return None
+
+    data_offset = offset + SLOT_HEADER_SIZE
+    rows = np.ndarray((height, pitch), dtype=np.uint8, buffer=buf, offset=data_offset)
+    # Single copy out of shared memory, dropping any row padding
+    pixels = rows[:, :width * 4].copy().reshape(height, width, 4)
+
+    if struct.unpack_from('<Q', buf, offset)[0] != sequence:
+        return None
+    return frame_index, timestamp, pixels, fmt.decode()
+
+
+class SharedFrameReader:
+    """Attaches to a FrameOutput ring buffer from another process
+
+    read_latest() returns the newest complete frame as (frame index,
+    timestamp, pixels, format), where pixels is a height x width x 4 uint8
+    array in the byte order given by format (e.g. 'BGRX') and the timestamp
+    is time.monotonic() at copy time, or None when no new frame has been
+    published. Readers never block the renderer; frames_missed counts
+    frames that went by between reads.
+    """
+
+    def __init__(self, name):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the segment for unlinking when this process exits.
+            # The registration is shared with a FrameOutput in this process, which unlinks it itself.
+            self.shm = shared_memory.SharedMemory(name=name)
+            if name not in _created_here:
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+
+        if self.shm.size < HEADER_SIZE:
+            self.shm.close()
+            raise ValueError(f"'{name}' is not a frame output buffer")
+        magic, version, self.slots, slot_header_size, self.capacity, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION or slot_header_size != SLOT_HEADER_SIZE:
+            self.shm.close()
+            raise ValueError(f"'{name}' is not a frame output buffer")
+
+        self.last_written = None
+        self.last_index = None
+        self.frames_missed = 0
+
+    def frames_written(self):
+        return struct.unpack_from('<Q', self.shm.buf, FRAMES_WRITTEN_OFFSET)[0]
+
+    def read_latest(self, retries=3):
+        for _ in range(retries):
+            written = self.frames_written()
+            if written == 0 or written == self.last_written:
+                return None
+
+            frame = read_slot(self.shm.buf, (written - 1) % self.slots, self.capacity)
+            if frame is None:
+                continue
+
+            self.last_written = written
+            frame_index = frame[0]
+            if self.last_index is not None and frame_index > self.last_index + 1:
+                self.frames_missed += frame_index - self.last_index - 1
+            self.last_index = frame_index
+            return frame
+        return None
+
+    def close(self):
+        self.shm.close()
@@ -0,0 +1,157 @@
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from tracing import tracer
+
+class HybridHeadTracker:
+    """Follows each viewer's nose with sparse optical flow between landmarker detections
+
+    The full face landmarker only runs to acquire faces, to refresh them every
+    refresh_interval frames, and whenever the flow confidence drops below
+    min_confidence. In between, features inside a small grayscale crop around
+    each nose are followed with pyramidal Lucas-Kanade flow.
+    """
+
+    NOSE_LANDMARK = 1
+    MIN_POINTS = 6
+    MAX_POINTS = 30
+    MAX_FLOW_ERROR = 1.0  # forward-backward error in pixels
+    MAX_GAP = 0.25  # seconds between frames before flow is no longer trusted
+
+    def __init__(self, detector, refresh_interval=15, min_confidence=0.6, crop_radius=40):
+        self.detector = detector
+        self.refresh_interval = refresh_interval
+        self.min_confidence = min_confidence
+        self.crop_radius = crop_radius
+
+        self.lk_params = dict(
+            winSize=(15, 15),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+        )
+
+        self.tracks = []
+        self.frames_since_detection = 0
+        self.last_frame_time = 0.0
+
+        self.landmarker_runs = 0
+        self.flow_frames = 0
+        self.fallbacks = 0
+
+    def track(self, frame):
+        # Returns nose positions in normalised [-1, 1] coordinates for a mirrored BGR frame
+        now = time.perf_counter()
+        gap = now - self.last_frame_time
+        self.last_frame_time = now
+
+        needs_detection = (
+            not self.tracks
+            or self.frames_since_detection >= self.refresh_interval
+            or gap > self.MAX_GAP
+        )
+
+        if not needs_detection:
+            with tracer.span('tracking.flow'):
+                tracked = self._track_flow(frame)
+            if tracked:
+                self.flow_frames += 1
+                self.frames_since_detection += 1
+                return self._positions(frame)
+            self.fallbacks += 1
+
+        with tracer.span('tracking.landmarker'):
+            self._detect(frame)
+        return self._positions(frame)
+
+    def _detect(self, frame):
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+        results = self.detector.detect(mp_image)
+        self.landmarker_runs += 1
+        self.frames_since_detection = 0
+
+        height, width = frame.shape[:2]
+        self.tracks = []
+        for landmarks in results.face_landmarks:
+            nose = landmarks[self.NOSE_LANDMARK]
+            track = {'nose': np.array([nose.x * width, nose.y * height], dtype=np.float32)}
+            self._seed_track(frame, track)
+            self.tracks.append(track)
+
+    def _crop(self, frame, centre):
+        # Small grayscale patch around a point, clamped to the frame
+        height, width = frame.shape[:2]
+        r = self.crop_radius
+        x0 = int(min(max(0, centre[0] - r), max(0, width - 2 * r)))
+        y0 = int(min(max(0, centre[1] - r), max(0, height - 2 * r)))
+        patch = frame[y0:y0 + 2 * r, x0:x0 + 2 * r]
+        return cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY), np.array([x0, y0], dtype=np.float32)
+
+    def _seed_track(self, frame, track):
+        gray, origin = self._crop(frame, track['nose'])
+        points = cv2.goodFeaturesToTrack(gray, self.MAX_POINTS, 0.01, 4)
+        track['gray'] = gray
+        track['origin'] = origin
+        track['points'] = points
+
+    def _track_flow(self, frame):
+        # Move every track by the median flow of its points; False if any track is unreliable
+        for track in self.tracks:
+            points = track['points']
+            if points is None or len(points) < self.MIN_POINTS:
+                return False
+
+            # Same window in the new frame, so both crops share coordinates
+            origin = track['origin']
+            r = self.crop_radius
+            x0, y0 = int(origin[0]), int(origin[1])
+            patch = frame[y0:y0 + 2 * r, x0:x0 + 2 * r]
+            if patch.shape[:2] != track['gray'].shape:
+                return False
+            gray = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(track['gray'], gray, points, None, **self.lk_params)
+            back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, track['gray'], new_points, None, **self.lk_params)
+
+            error = np.linalg.norm((points - back_points).reshape(-1, 2), axis=1)
+            good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < self.MAX_FLOW_ERROR)
+
+            confidence = good.sum() / len(points)
+            if confidence < self.min_confidence or good.sum() < self.MIN_POINTS:
+                return False
+
+            shift = np.median((new_points - points).reshape(-1, 2)[good], axis=0)
+            track['nose'] = track['nose'] + shift
+
+            # Recentre the crop on the nose and carry the surviving points across
+            track['gray'], track['origin'] = self._crop(frame, track['nose'])
+            track['points'] = (new_points[good] + (origin - track['origin'])).reshape(-1, 1, 2)
+            if len(track['points']) < self.MAX_POINTS // 2:
+                track['points'] = cv2.goodFeaturesToTrack(track['gray'], self.MAX_POINTS, 0.01, 4)
+
+        return True
+
+    def _positions(self, frame):
+        height, width = frame.shape[:2]
+        positions = []
+        for track in self.tracks:
+            hx = (track['nose'][0] / width - 0.5) * 2
+            hy = (track['nose'][1] / height - 0.5) * 2
+            positions.append((float(hx), float(hy)))
+
+        # Left to right, so new viewers are given viewports in that order
+        positions.sort()
+        return positions
+
+    def report(self):
+        total = self.landmarker_runs + self.flow_frames
+        if total == 0:
+            return "Head tracker: no frames tracked"
+        flow_share = self.flow_frames / total * 100
+        return (
+            f"Head tracker: {total} frames, {self.landmarker_runs} landmarker runs, "
+            f"{self.flow_frames} optical flow ({flow_share:.0f}%), {self.fallbacks} low-confidence fallbacks"
+        )
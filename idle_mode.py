@@ -0,0 +1,121 @@
+import time
+
+class IdleMonitor:
+    """Drops render and detection rates while nobody is in front of the portal"""
+
+    # Cap on scene updates in one idle frame, so a long stall doesn't turn into a burst
+    MAX_CATCH_UP_STEPS = 30
+
+    def __init__(self, timeout=30.0, active_fps=60, idle_fps=10, idle_detect_interval=1.0):
+        self.timeout = timeout
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_detect_interval = idle_detect_interval
+
+        self.idle = False
+        now = time.perf_counter()
+        self.last_seen = now
+        self.last_detection = 0.0
+
+        # Per-state accounting: wall time, CPU time, frames and detections
+        self.stats = {
+            'active': {'wall': 0.0, 'cpu': 0.0, 'frames': 0, 'detections': 0},
+            'idle': {'wall': 0.0, 'cpu': 0.0, 'frames': 0, 'detections': 0}
+        }
+        self.idle_periods = 0
+        self._frame_wall = now
+        self._frame_cpu = time.process_time()
+
+        # Scene updates owed while idle, in fixed steps of 1 / active_fps
+        self._last_step_time = now
+        self._step_debt = 0.0
+
+    @property
+    def state(self):
+        return 'idle' if self.idle else 'active'
+
+    @property
+    def fps(self):
+        return self.idle_fps if self.idle else self.active_fps
+
+    def simulation_steps(self):
+        # One step per frame while active; while idle, enough steps to keep the scene moving at real-time speed
+        now = time.perf_counter()
+        elapsed = now - self._last_step_time
+        self._last_step_time = now
+
+        if not self.idle:
+            self._step_debt = 0.0
+            return 1
+
+        self._step_debt += elapsed * self.active_fps
+        steps = int(self._step_debt)
+        self._step_debt -= steps
+        return min(steps, self.MAX_CATCH_UP_STEPS)
+
+    def should_detect(self):
+        # Detect every frame while active, poll slowly while idle
+        if not self.idle:
+            return True
+        return time.perf_counter() - self.last_detection >= self.idle_detect_interval
+
+    def record_detection(self, found):
+        now = time.perf_counter()
+        self.last_detection = now
+        self.stats[self.state]['detections'] += 1
+
+        if found:
+            self.last_seen = now
+            if self.idle:
+                # Wake up on the first detection that sees a face
+                self.idle = False
+                print("Viewer detected, leaving idle mode")
+        elif not self.idle and now - self.last_seen > self.timeout:
+            self.idle = True
+            self.idle_periods += 1
+            print(f"No viewer for {self.timeout:.0f}s, entering idle mode")
+
+    def end_frame(self):
+        # Charge the time since the last frame to the current state
+        now_wall = time.perf_counter()
+        now_cpu = time.process_time()
+
+        bucket = self.stats[self.state]
+        bucket['wall'] += now_wall - self._frame_wall
+        bucket['cpu'] += now_cpu - self._frame_cpu
+        bucket['frames'] += 1
+
+        self._frame_wall = now_wall
+        self._frame_cpu = now_cpu
+
+    def report(self):
+        lines = ["Idle mode report:"]
+
+        for state in ('active', 'idle'):
+            bucket = self.stats[state]
+            if bucket['wall'] <= 0:
+                lines.append(f"  {state:<6}  no time spent")
+                continue
+
+            fps = bucket['frames'] / bucket['wall']
+            cpu_load = bucket['cpu'] / bucket['wall'] * 100
+            detect_rate = bucket['detections'] / bucket['wall']
+            lines.append(
+                f"  {state:<6}  {bucket['wall']:8.1f}s  {fps:5.1f} fps  "
+                f"{detect_rate:5.1f} detections/s  {cpu_load:5.1f}% CPU"
+            )
+
+        active = self.stats['active']
+        idle = self.stats['idle']
+        if active['wall'] > 0 and idle['wall'] > 0:
+            # CPU time idle periods would have cost at the active rate
+            active_rate = active['cpu'] / active['wall']
+            saved = idle['wall'] * active_rate - idle['cpu']
+            would_cost = idle['wall'] * active_rate
+            percent = saved / would_cost * 100 if would_cost > 0 else 0
+            lines.append(
+                f"  saved   {saved:8.1f}s CPU over {self.idle_periods} idle period(s) "
+                f"({percent:.0f}% of the active rate)"
+            )
+
+        return "\n".join(lines)
@@ -0,0 +1,137 @@
+import time
+from collections import deque
+
+import pygame
+
+def now():
+    # All pipeline timestamps use the monotonic clock, the same clock V4L2 stamps buffers with
+    return time.monotonic()
+
+def capture_timestamp(cap, read_done, prop_pos_msec):
+    # Prefer the driver's buffer timestamp when it is on our clock, else the time read() returned
+    try:
+        stamp = cap.get(prop_pos_msec) / 1000.0
+    except:
+        return read_done, False
+
+    if 0.0 <= read_done - stamp < 1.0:
+        return stamp, True
+    return read_done, False
+
+
+class LatencyTracker:
+    """Motion-to-photon latency histograms, broken down per pipeline stage"""
+
+    STAGES = ['capture', 'inference', 'smoothing', 'render', 'total']
+    BIN_MS = 2
+    NUM_BINS = 100  # last bin collects everything above 198 ms
+
+    def __init__(self, smoothing_factor, history=600):
+        self.smoothing_factor = smoothing_factor
+        self.recent = {stage: deque(maxlen=history) for stage in self.STAGES}
+        self.bins = {stage: [0] * self.NUM_BINS for stage in self.STAGES}
+        self.samples = 0
+        self.driver_timestamps = 0
+
+        self.pending = None
+        self.last_detect_done = None
+        self.detect_interval = None
+
+    def pose_ready(self, timestamps):
+        # Called when a detection result has been smoothed and is about to be rendered
+        captured, read_done, detect_done, driver_stamp = timestamps
+
+        # An exponential moving average lags by factor / (1 - factor) updates
+        if self.last_detect_done is not None:
+            interval = detect_done - self.last_detect_done
+            if self.detect_interval is None:
+                self.detect_interval = interval
+            else:
+                self.detect_interval = self.detect_interval * 0.9 + interval * 0.1
+        self.last_detect_done = detect_done
+
+        interval = self.detect_interval or 0.0
+        smoothing_delay = self.smoothing_factor / (1 - self.smoothing_factor) * interval
+
+        self.pending = (captured, read_done, detect_done, smoothing_delay, driver_stamp)
+
+    def detection_missed(self):
+        # A detection that found no face; the next interval starts from the next face found,
+        # so absences and idle periods don't count as detection intervals
+        self.last_detect_done = None
+
+    def frame_presented(self):
+        # Called right after pygame.display.flip() for the frame that used the pending pose
+        if self.pending is None:
+            return
+
+        flip_done = now()
+        captured, read_done, detect_done, smoothing_delay, driver_stamp = self.pending
+        self.pending = None
+
+        stages = {
+            'capture': read_done - captured,
+            'inference': detect_done - read_done,
+            'smoothing': smoothing_delay,
+            'render': flip_done - detect_done
+        }
+        stages['total'] = sum(stages.values())
+
+        for stage, seconds in stages.items():
+            ms = seconds * 1000
+            self.recent[stage].append(ms)
+            index = min(self.NUM_BINS - 1, max(0, int(ms / self.BIN_MS)))
+            self.bins[stage][index] += 1
+
+        self.samples += 1
+        if driver_stamp:
+            self.driver_timestamps += 1
+
+    def percentiles(self, stage):
+        values = sorted(self.recent[stage])
+        if not values:
+            return None
+
+        def pick(p):
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        return sum(values) / len(values), pick(0.5), pick(0.95), pick(0.99), values[-1]
+
+    def summary_lines(self):
+        lines = []
+        for stage in self.STAGES:
+            stats = self.percentiles(stage)
+            if stats is None:
+                continue
+            mean, p50, p95, p99, worst = stats
+            lines.append(
+                f"{stage:<10} mean {mean:6.1f}  p50 {p50:6.1f}  p95 {p95:6.1f}  "
+                f"p99 {p99:6.1f}  max {worst:6.1f} ms"
+            )
+        return lines
+
+    def report(self):
+        lines = [f"Latency report ({self.samples} samples, recent window):"]
+        if self.samples and self.driver_timestamps < self.samples:
+            lines.append("  capture queueing is only measured for frames with driver buffer timestamps")
+        lines.extend("  " + line for line in self.summary_lines())
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        # Summary followed by the full-run histograms, one row per bin
+        with open(path, 'w') as f:
+            f.write(self.report() + "\n\n")
+            f.write("bin_ms," + ",".join(self.STAGES) + "\n")
+            for i in range(self.NUM_BINS):
+                counts = ",".join(str(self.bins[stage][i]) for stage in self.STAGES)
+                f.write(f"{i * self.BIN_MS},{counts}\n")
+
+    def render_overlay(self, screen, font):
+        y = 8
+        for line in self.summary_lines():
+            text = font.render(line, True, (0, 255, 120))
+            background = pygame.Surface((text.get_width() + 8, text.get_height() + 2))
+            background.set_alpha(160)
+            screen.blit(background, (4, y - 1))
+            screen.blit(text, (8, y))
+            y += text.get_height() + 2
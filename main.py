@@ -3,8 +3,8 @@ import cv2
 import random
 import time
 import math
+import os
 
-import mediapipe as mp
 from mediapipe.tasks.python import vision
 from mediapipe.tasks import python
 
@@ -12,11 +12,25 @@ from threading import Thread
 from queue import Queue
 
 # Import existing components
-from matrix_style import MatrixRainSystem
+from matrix_style import MatrixRainSystem, STREAM_JOBS
 from data_planes import DataPlaneSystem
+from idle_mode import IdleMonitor
+from simulation import Simulation
+from latency import LatencyTracker, capture_timestamp, now
+from head_tracking import HybridHeadTracker
+from memory_stats import MemoryMonitor
+from tracing import tracer
+from render_scale import RenderScaler
+from scene_builder import SceneBuilder
+from frame_output import FrameOutput, EncoderWriter
+
+from contextlib import contextmanager
 
 # Central error display - floating
 class CentralErrorDisplay:
+    PULSE_FRAMES = 32
+    TRIANGLE_SPACING = 4.0
+    
     def __init__(self):
         self.pulse_time = 0
         self.pulse_speed = 0.08
@@ -32,6 +46,13 @@ class CentralErrorDisplay:
         self.float_time = 0
         self.float_speed = 0.02
         
+        # Pre-rendered sprites sampled across the pulse period, rebuilt when the projection changes
+        self._sprites = [None] * self.PULSE_FRAMES
+        self._sprite_key = None
+        
+        # Offscreen render resolution relative to the display
+        self.render_scale = 1.0
+        
     def update(self, dt=0.016):
         # Update animations
         self.pulse_time += self.pulse_speed
@@ -47,66 +68,109 @@ class CentralErrorDisplay:
         self.x_offset = math.sin(self.float_time) * 0.3
         self.y_offset = math.cos(self.float_time * 0.7) * 0.2
     
-    def render(self, screen, project_func, hx, hy, width, height):
+    def snapshot(self):
+        return self.x_offset + self.glitch_offset, self.y_offset, self.pulse_time
+    
+    def render(self, screen, project_func, hx, hy, width, height, state=None):
+        if state is None:
+            state = self.snapshot()
+        
         # Calculate 3D position with float offset
-        center_3d_x = self.x_offset + self.glitch_offset
-        center_3d_y = self.y_offset
+        center_3d_x, center_3d_y, pulse_time = state
         center_3d_z = self.z_position
         
         # Project to screen space
         center_x, center_y = project_func(center_3d_x, center_3d_y, center_3d_z, hx, hy, width, height)
         
-        # Calculate scale based on depth
-        z_normalized = (center_3d_z - 0) / (40 - 0)  
+        # Triangle spacing on screen depends only on depth and projection scale, not head position
+        ref_x, _ = project_func(0, 0, center_3d_z, 0, 0, width, height)
+        side_x, _ = project_func(self.TRIANGLE_SPACING, 0, center_3d_z, 0, 0, width, height)
+        triangle_dx = side_x - ref_x
+        
+        sprite_key = (triangle_dx, self.render_scale)
+        if sprite_key != self._sprite_key:
+            self._sprite_key = sprite_key
+            self._sprites = [None] * self.PULSE_FRAMES
+        
+        # Nearest pre-rendered step of the pulse, built on first use
+        phase = (pulse_time % (2 * math.pi)) / (2 * math.pi)
+        index = int(round(phase * self.PULSE_FRAMES)) % self.PULSE_FRAMES
+        sprite = self._sprites[index]
+        if sprite is None:
+            sprite = self._build_sprite(index * 2 * math.pi / self.PULSE_FRAMES, triangle_dx)
+            if sprite is None:
+                return
+            self._sprites[index] = sprite
+        
+        surface, (anchor_x, anchor_y) = sprite
+        screen.blit(surface, (center_x - anchor_x, center_y - anchor_y), special_flags=pygame.BLEND_PREMULTIPLIED)
+    
+    def _build_sprite(self, pulse_time, triangle_dx):
+        # Render the whole display for one pulse phase into a premultiplied-alpha sprite
+        z_normalized = (self.z_position - 0) / (40 - 0)  
         z_normalized = max(0.0, min(1.0, z_normalized))
         depth_scale = 1.0 / (1.0 + z_normalized * 1.5)
         
         # Pulse effect
-        pulse_factor = 1.0 + 0.2 * math.sin(self.pulse_time)
-        combined_scale = depth_scale * pulse_factor
+        pulse_factor = 1.0 + 0.2 * math.sin(pulse_time)
+        combined_scale = depth_scale * pulse_factor * self.render_scale
         
         try:
             font_large = pygame.font.Font(None, int(80 * combined_scale))
             font_small = pygame.font.Font(None, int(40 * combined_scale))
         except:
-            return
+            return None
         
         depth_brightness = 1.0 - (z_normalized * 0.3)
         
-        # "SYSTEM" text
         system_color = (int(0 * depth_brightness), int(255 * depth_brightness), int(255 * depth_brightness))
-        system_text = font_small.render("SYSTEM", True, system_color)
+        system_text = self._premultiplied(font_small.render("SYSTEM", True, system_color))
+        
+        error_color = (int(255 * depth_brightness), 0, int(255 * depth_brightness))
+        error_text = self._premultiplied(font_large.render("ERROR", True, error_color))
+        
+        triangle_size = int(30 * combined_scale)
+        triangle_extent = int(triangle_size * pulse_factor) + max(2, int(3 * pulse_factor))
+        glow_extent = int(3 * combined_scale)
+        
+        # Sprite extends far enough each side of the centre for text, glow and triangles
+        half_w = max(abs(triangle_dx) + triangle_extent, error_text.get_width() // 2 + glow_extent, system_text.get_width() // 2) + 2
+        half_h = max(
+            int(40 * combined_scale) + system_text.get_height() // 2,
+            int(20 * combined_scale) + error_text.get_height() // 2 + glow_extent,
+            triangle_extent
+        ) + 2
+        surface = pygame.Surface((half_w * 2, half_h * 2), pygame.SRCALPHA)
+        center_x, center_y = half_w, half_h
+        
+        # "SYSTEM" text
         system_rect = system_text.get_rect(center=(center_x, center_y - int(40 * combined_scale)))
-        screen.blit(system_text, system_rect)
+        surface.blit(system_text, system_rect, special_flags=pygame.BLEND_PREMULTIPLIED)
         
         # "ERROR" text 
-        error_color = (int(255 * depth_brightness), 0, int(255 * depth_brightness))
-        error_text = font_large.render("ERROR", True, error_color)
         error_rect = error_text.get_rect(center=(center_x, center_y + int(20 * combined_scale)))
         
         # Glow effect
         for offset in range(3, 0, -1):
             glow_alpha = 0.2 / offset * depth_brightness
             glow_color = (int(255 * glow_alpha), 0, int(255 * glow_alpha))
-            glow_text = font_large.render("ERROR", True, glow_color)
-            glow_rect = glow_text.get_rect(center=(center_x, center_y + int(20 * combined_scale)))
+            glow_text = self._premultiplied(font_large.render("ERROR", True, glow_color))
             offset_scaled = int(offset * combined_scale)
-            screen.blit(glow_text, (glow_rect.x - offset_scaled, glow_rect.y - offset_scaled))
-            screen.blit(glow_text, (glow_rect.x + offset_scaled, glow_rect.y + offset_scaled))
+            surface.blit(glow_text, (error_rect.x - offset_scaled, error_rect.y - offset_scaled), special_flags=pygame.BLEND_PREMULTIPLIED)
+            surface.blit(glow_text, (error_rect.x + offset_scaled, error_rect.y + offset_scaled), special_flags=pygame.BLEND_PREMULTIPLIED)
         
-        screen.blit(error_text, error_rect)
+        surface.blit(error_text, error_rect, special_flags=pygame.BLEND_PREMULTIPLIED)
         
         # Warning triangles 
-        triangle_size = int(30 * combined_scale)
-        triangle_spacing = 4.0  
-        
-        # Left triangle
-        left_x, left_y = project_func(center_3d_x - triangle_spacing, center_3d_y, center_3d_z, hx, hy, width, height)
-        self._draw_warning_triangle(screen, left_x, left_y, triangle_size, pulse_factor, depth_brightness)
+        self._draw_warning_triangle(surface, center_x - triangle_dx, center_y, triangle_size, pulse_factor, depth_brightness)
+        self._draw_warning_triangle(surface, center_x + triangle_dx, center_y, triangle_size, pulse_factor, depth_brightness)
         
-        # Right triangle
-        right_x, right_y = project_func(center_3d_x + triangle_spacing, center_3d_y, center_3d_z, hx, hy, width, height)
-        self._draw_warning_triangle(screen, right_x, right_y, triangle_size, pulse_factor, depth_brightness)
+        return surface, (center_x, center_y)
+    
+    @staticmethod
+    def _premultiplied(text_surface):
+        # Font surfaces can be padded past their width, which premul_alpha mishandles; copy() repacks them
+        return text_surface.copy().premul_alpha()
     
     def _draw_warning_triangle(self, screen, x, y, size, pulse, brightness):
         size = int(size * pulse)
@@ -126,6 +190,10 @@ class CentralErrorDisplay:
 SCALE = 120
 EYE_DIST = 8.0
 
+# Projection scale relative to a full-window view: the offscreen render resolution times
+# the fraction each viewport is of the window
+render_scale = 1.0
+
 def project(x, y, z, hx, hy, width, height):
     d = EYE_DIST + z
     if d <= 0:
@@ -133,40 +201,109 @@ def project(x, y, z, hx, hy, width, height):
     f = EYE_DIST / d
     sx = hx + (x - hx) * f
     sy = hy + (y - hy) * f
-    px = int(width/2 + sx * SCALE)
-    py = int(height/2 + sy * SCALE)
+    px = int(width/2 + sx * SCALE * render_scale)
+    py = int(height/2 + sy * SCALE * render_scale)
     return px, py
 
-def get_head_position(cap, detector):
-    # Get head position using MediaPipe Face Landmarker
-    ret, frame = cap.read()
+def drain_capture(cap, max_frames=8):
+    # Discard frames the driver queued since the last read; queued frames come back at once,
+    # so stop as soon as a grab has to wait for the camera
+    for _ in range(max_frames):
+        start = time.perf_counter()
+        if not cap.grab() or time.perf_counter() - start > 0.005:
+            return
+
+def get_head_positions(cap, tracker, drain=False):
+    # Get one head position per tracked face using the hybrid landmarker/optical flow tracker,
+    # along with the frame's capture, read and detection timestamps
+    with tracer.span('tracking.read'):
+        if drain:
+            drain_capture(cap)
+        ret, frame = cap.read()
+    read_done = now()
     if not ret:
-        return 0, 0, False
+        return [], None
+    captured, driver_stamp = capture_timestamp(cap, read_done, cv2.CAP_PROP_POS_MSEC)
     
     frame = cv2.flip(frame, 1)
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
     
-    results = detector.detect(mp_image)
+    # Nose tip, from the landmarker or optical flow
+    positions = tracker.track(frame)
+    detect_done = now()
     
-    if not results.face_landmarks:
-        return 0, 0, False
+    return positions, (captured, read_done, detect_done, driver_stamp)
+
+def calculate_viewports(width, height, count):
+    # Split the window into one viewport per viewer
+    if count <= 3:
+        cols, rows = max(1, count), 1
+    else:
+        cols, rows = 2, 2
     
-    # Use nose tip 
-    nose = results.face_landmarks[0][1]
-    hx = (nose.x - 0.5) * 2
-    hy = (nose.y - 0.5) * 2
+    viewports = []
+    for i in range(max(1, count)):
+        col = i % cols
+        row = i // cols
+        x1 = col * width // cols
+        x2 = (col + 1) * width // cols
+        y1 = row * height // rows
+        y2 = (row + 1) * height // rows
+        viewports.append(pygame.Rect(x1, y1, x2 - x1, y2 - y1))
+    return viewports
+
+def match_viewers(positions, previous):
+    # Give each detection the viewer slot whose last position is nearest, so viewers keep their viewport
+    matched = [None] * len(previous)
+    pairs = sorted(
+        ((hx - px) ** 2 + (hy - py) ** 2, i, j)
+        for j, (hx, hy) in enumerate(positions)
+        for i, (px, py) in enumerate(previous)
+    )
+    used = set()
+    for _, i, j in pairs:
+        if matched[i] is None and j not in used:
+            matched[i] = positions[j]
+            used.add(j)
     
-    return hx, hy, True
+    # New viewers take fresh slots, left to right
+    matched.extend(position for j, position in enumerate(positions) if j not in used)
+    return matched
+
+def calculate_bounds(width, height):
+    # Tunnel bounds for a viewport of the given size
+    aspect_ratio = width / height
+    y_range = 12
+    x_range = y_range * aspect_ratio
+    return (-x_range / 2, x_range / 2, -y_range / 2, y_range / 2, 0, 40)
+
+# Each tracked face gets its own viewport of the shared tunnel
+MAX_VIEWERS = 4
+
+# Workers that build the rain streams and data planes in parallel, at most one per core and
+# per rain job. 'process' forks them here, before pygame and MediaPipe start any threads;
+# 'thread' keeps everything in this process.
+SCENE_BUILD_WORKERS = 4
+SCENE_BUILD_POOL = 'process'
+scene_builder = SceneBuilder(workers=SCENE_BUILD_WORKERS, kind=SCENE_BUILD_POOL, max_jobs=STREAM_JOBS)
 
 # Initialise MediaPipe Face Landmarker
 base_options = python.BaseOptions(model_asset_path='face_landmarker.task')
 options = vision.FaceLandmarkerOptions(
     base_options=base_options,
-    num_faces=1
+    num_faces=MAX_VIEWERS
 )
 detector = vision.FaceLandmarker.create_from_options(options)
 
+# Landmarker runs at least every TRACKER_REFRESH_INTERVAL frames, optical flow in between
+TRACKER_REFRESH_INTERVAL = 15
+TRACKER_MIN_CONFIDENCE = 0.6
+head_tracker = HybridHeadTracker(detector, TRACKER_REFRESH_INTERVAL, TRACKER_MIN_CONFIDENCE)
+
+# Render without a window, e.g. when the output is only consumed through FRAME_OUTPUT
+HEADLESS = False
+if HEADLESS:
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
 # Initialise pygame
 pygame.init()
 
@@ -183,119 +320,282 @@ WIN_WIDTH, WIN_HEIGHT = screen.get_size()
 pygame.display.set_caption("SYSTEM ERROR - Cyberpunk Portal")
 clock = pygame.time.Clock()
 
-# Calculate bounds
-aspect_ratio = WIN_WIDTH / WIN_HEIGHT
-y_range = 12
-x_range = y_range * aspect_ratio
+# Tunnel bounds for the whole window, shared by every viewport layout
+bounds = calculate_bounds(WIN_WIDTH, WIN_HEIGHT)
 
-min_x = -x_range / 2
-max_x = x_range / 2
-min_y = -6
-max_y = 6
-min_z = 0
-max_z = 40  
+# Draw the scene at a fraction of the display resolution and upscale it once per frame.
+# With DYNAMIC_RENDER_SCALE the fraction adapts to frame time, down to MIN_RENDER_SCALE.
+RENDER_SCALE = 1.0
+DYNAMIC_RENDER_SCALE = False
+MIN_RENDER_SCALE = 0.5
+SMOOTH_UPSCALE = True
+render_scaler = RenderScaler(RENDER_SCALE, DYNAMIC_RENDER_SCALE, 1000 / 60, MIN_RENDER_SCALE)
+scene = None
 
-bounds = (min_x, max_x, min_y, max_y, min_z, max_z)
+# Horizontal bands the rain layer is rasterized in, in parallel; 0 draws it in one pass
+RAIN_RENDER_BANDS = 0
 
 # Create systems with CYBERPUNK COLORS
-rain_system = MatrixRainSystem(num_streams=400, bounds=bounds)
-plane_system = DataPlaneSystem(num_planes=25, bounds=bounds) 
+rain_system = MatrixRainSystem(num_streams=400, bounds=bounds, render_bands=RAIN_RENDER_BANDS, builder=scene_builder)
+plane_system = DataPlaneSystem(num_planes=25, bounds=bounds, builder=scene_builder)
+
+# Message sprites for the starting render scale. Resizes keep the plane depths, so these stay valid.
+plane_system.render_scale = render_scaler.scale
+plane_system.prewarm_atlas()
 
 # Create central error display
 central_display = CentralErrorDisplay()
 
+# Memory instrumentation: per-section allocations via tracemalloc, and when to run the GC.
+# GC_MODE 'frame' disables automatic collection and collects between frames instead.
+MEMORY_PROFILE = False
+GC_MODE = 'auto'
+memory = MemoryMonitor(trace=MEMORY_PROFILE, gc_mode=GC_MODE, report_interval=600 if MEMORY_PROFILE else 0)
+
+# Chrome trace of every frame stage, kept in a ring buffer: F9 dumps it,
+# and it is dumped automatically when a frame takes longer than TRACE_SPIKE_MS
+TRACE_ENABLED = False
+TRACE_SPIKE_MS = 40
+tracer.enabled = TRACE_ENABLED
+
+@contextmanager
+def stage(name):
+    # A traced and memory-profiled stage of the frame
+    with tracer.span(name), memory.section(name):
+        yield
+
+# Update the next frame on a worker thread while the current one is drawn.
+# Profiling runs it serially so allocations are attributed to the right section.
+THREADED_SIMULATION = True
+simulation = Simulation(
+    [rain_system, plane_system, central_display],
+    bounded_systems=[plane_system, rain_system],
+    threaded=THREADED_SIMULATION and not MEMORY_PROFILE
+)
+
 # Start webcam
 cap = cv2.VideoCapture(0)
 
-# Head position smoothing
-prev_hx, prev_hy = 0.0, 0.0
+# Head position smoothing, one entry per viewer
+prev_positions = [(0.0, 0.0)]
 SMOOTHING_FACTOR = 0.7
 
-# Base bounds
-BASE_Y_RANGE = 12
-BASE_ASPECT_RATIO = WIN_WIDTH / WIN_HEIGHT
+# Frames a viewer may go undetected before their viewport is removed
+VIEWER_DROP_FRAMES = 30
+num_viewers = 1
+missing_frames = 0
+
+# Idle mode: seconds without a face before dropping to low-power rates
+IDLE_TIMEOUT = 30.0
+IDLE_FPS = 10
+IDLE_DETECT_INTERVAL = 1.0
+idle_monitor = IdleMonitor(IDLE_TIMEOUT, 60, IDLE_FPS, IDLE_DETECT_INTERVAL)
+
+# Motion-to-photon latency: L toggles the overlay, the report is written on exit if a path is set
+LATENCY_OVERLAY = False
+LATENCY_REPORT_PATH = None
+latency_tracker = LatencyTracker(SMOOTHING_FACTOR)
+latency_font = pygame.font.Font(None, 20)
+
+# Publish every presented frame to a shared-memory ring buffer for recorders and streamers
+# (see SharedFrameReader in frame_output.py). FRAME_ENCODER_COMMAND optionally pipes raw frames
+# to an encoder, e.g. ['ffmpeg', '-f', 'rawvideo', '-pix_fmt', '{pix_fmt}', '-s', '{width}x{height}',
+# '-r', '60', '-i', '-', 'portal.mp4']. Slow consumers miss frames; rendering never waits for them.
+FRAME_OUTPUT = False
+FRAME_OUTPUT_NAME = 'cyberpunk_portal_frames'
+FRAME_OUTPUT_SLOTS = 4
+FRAME_ENCODER_COMMAND = None
+frame_output = None
+if FRAME_OUTPUT:
+    desktop_width, desktop_height = pygame.display.get_desktop_sizes()[0]
+    frame_output = FrameOutput(
+        FRAME_OUTPUT_NAME,
+        (max(desktop_width, WIN_WIDTH), max(desktop_height, WIN_HEIGHT)),
+        FRAME_OUTPUT_SLOTS,
+        EncoderWriter(FRAME_ENCODER_COMMAND) if FRAME_ENCODER_COMMAND else None
+    )
 
 # Glitch effect variables
 glitch_intensity = 0
 glitch_timer = 0
 
 # Main loop
+memory.start_frames()
+frame_index = 0
 running = True
 while running:
+    frame_start = time.perf_counter()
+    tracer.begin_frame(frame_index)
+    frame_index += 1
+    
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 running = False
+            if event.key == pygame.K_l:
+                LATENCY_OVERLAY = not LATENCY_OVERLAY
+            if event.key == pygame.K_F9 and tracer.enabled:
+                tracer.dump(time.strftime('trace_%Y%m%d_%H%M%S.json'))
         if event.type == pygame.VIDEORESIZE:
             # Handle window resize
             WIN_WIDTH, WIN_HEIGHT = event.w, event.h
             screen = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT), pygame.RESIZABLE)
-            
-            # Recalculate bounds for new aspect ratio
-            aspect_ratio = WIN_WIDTH / WIN_HEIGHT
-            y_range = 12
-            x_range = y_range * aspect_ratio
-            min_x = -x_range / 2
-            max_x = x_range / 2
-            dynamic_bounds = (min_x, max_x, -6, 6, 0, 40)
-            
-            plane_system.update_bounds(dynamic_bounds)
-            rain_system.update_bounds(dynamic_bounds)
-    
-    # Get head position
-    hx, hy, ok = get_head_position(cap, detector)
-    
-    if ok:
-        # Apply smoothing
-        hx = prev_hx * SMOOTHING_FACTOR + hx * (1 - SMOOTHING_FACTOR)
-        hy = prev_hy * SMOOTHING_FACTOR + hy * (1 - SMOOTHING_FACTOR)
-        prev_hx, prev_hy = hx, hy
+    
+    # Get head positions, polling slowly while idle
+    if idle_monitor.should_detect():
+        with stage('tracking'):
+            # Idle polls are far apart, so skip the stale frames queued in between
+            positions, timestamps = get_head_positions(cap, head_tracker, drain=idle_monitor.idle)
+        idle_monitor.record_detection(bool(positions))
+        if not positions:
+            latency_tracker.detection_missed()
     else:
-        hx, hy = 0, 0
+        positions = []
     
-    # Clear screen with dark background
-    screen.fill((5, 0, 10)) 
+    matched = match_viewers(positions, prev_positions[:num_viewers])
     
-    # Scale head position
-    hx_scaled = hx * 8
-    hy_scaled = hy * 8
+    # Add viewports straight away, drop them only after a sustained loss
+    if len(positions) >= num_viewers:
+        num_viewers = max(1, len(positions))
+        missing_frames = 0
+    else:
+        missing_frames += 1
+        if missing_frames > VIEWER_DROP_FRAMES:
+            # Keep the viewers still detected, in their current order
+            kept = [i for i, position in enumerate(matched) if position is not None]
+            prev_positions = [prev_positions[i] for i in kept]
+            matched = [matched[i] for i in kept]
+            num_viewers = max(1, len(positions))
+            missing_frames = 0
     
-    # Calculate dynamic bounds
-    dynamic_bounds = (-x_range/2, x_range/2, -y_range/2, y_range/2, 0, 40)  
+    head_positions = []
+    for i in range(num_viewers):
+        prev_hx, prev_hy = prev_positions[i] if i < len(prev_positions) else (0.0, 0.0)
+        
+        if i < len(matched) and matched[i] is not None:
+            # Apply smoothing
+            hx, hy = matched[i]
+            hx = prev_hx * SMOOTHING_FACTOR + hx * (1 - SMOOTHING_FACTOR)
+            hy = prev_hy * SMOOTHING_FACTOR + hy * (1 - SMOOTHING_FACTOR)
+        elif positions or num_viewers > 1:
+            # Hold the last position while a viewer is briefly lost
+            hx, hy = prev_hx, prev_hy
+        else:
+            hx, hy = 0, 0
+        
+        head_positions.append((hx, hy))
+    prev_positions = head_positions
+    
+    if positions:
+        latency_tracker.pose_ready(timestamps)
+    
+    render_start = time.perf_counter()
+    
+    # Draw straight to the display at full scale, otherwise to an offscreen scene
+    scene_width, scene_height = render_scaler.scene_size(WIN_WIDTH, WIN_HEIGHT)
+    if (scene_width, scene_height) == screen.get_size():
+        scene = screen
+    elif scene is None or scene is screen or scene.get_size() != (scene_width, scene_height):
+        scene = pygame.Surface((scene_width, scene_height)).convert()
+    
+    # Clear screen with dark background
+    scene.fill((5, 0, 10)) 
+    
+    # Tunnel bounds follow the window, not the layout, so viewers coming and going don't rebuild the scene
+    viewports = calculate_viewports(scene_width, scene_height, num_viewers)
+    dynamic_bounds = calculate_bounds(scene_width, scene_height)
     
-    # Update bounds
-    plane_system.update_bounds(dynamic_bounds)
-    rain_system.update_bounds(dynamic_bounds)
+    # Shrink the projection so every viewport shows the whole tunnel rather than a crop of its middle
+    view_scale = min(viewports[0].w / scene_width, viewports[0].h / scene_height)
+    render_scale = render_scaler.scale * view_scale
+    rain_system.render_scale = render_scale
+    plane_system.render_scale = render_scale
+    central_display.render_scale = render_scale
     
-    # Update all systems
-    dt = 1/60
-    rain_system.update()
-    plane_system.update()
-    central_display.update(dt)
+    # Take this frame's state and start updating the next one, shared by every viewport
+    simulation_start = time.perf_counter()
+    with stage('simulation'):
+        rain_state, plane_state, central_state = simulation.wait()
+        simulation.set_bounds(dynamic_bounds)
+        simulation.start(idle_monitor.simulation_steps())
+    simulation_time = time.perf_counter() - simulation_start
     
     # Glitch effect disabled
     glitch_intensity = 0
     
-    # No glitch offset to head position
-    hx_glitched = hx_scaled
-    hy_glitched = hy_scaled
+    for viewport, (hx, hy) in zip(viewports, head_positions):
+        view = scene.subsurface(viewport)
+        view_width, view_height = viewport.size
+        
+        # Scale head position
+        hx_scaled = hx * 8
+        hy_scaled = hy * 8
+        
+        # No glitch offset to head position
+        hx_glitched = hx_scaled
+        hy_glitched = hy_scaled
+        
+        # Render in depth order
+        with stage('planes'):
+            plane_system.render(view, project, hx_glitched, hy_glitched, view_width, view_height, plane_state)
+        with stage('rain'):
+            rain_system.render(view, project, hx_glitched, hy_glitched, view_width, view_height, rain_state)
+        
+        # Render central error display 
+        with stage('central'):
+            central_display.render(view, project, hx_glitched, hy_glitched, view_width, view_height, central_state)
     
-    # Render in depth order
-    plane_system.render(screen, project, hx_glitched, hy_glitched, WIN_WIDTH, WIN_HEIGHT)
-    rain_system.render(screen, project, hx_glitched, hy_glitched, WIN_WIDTH, WIN_HEIGHT)
+    # Viewport dividers
+    for viewport in viewports[1:]:
+        pygame.draw.rect(scene, (0, 60, 60), viewport.inflate(2, 2), 1)
     
-    # Render central error display 
-    central_display.render(screen, project, hx_glitched, hy_glitched, WIN_WIDTH, WIN_HEIGHT)
+    # Upscale once to the display
+    if scene is not screen:
+        with stage('upscale'):
+            if SMOOTH_UPSCALE:
+                pygame.transform.smoothscale(scene, screen.get_size(), screen)
+            else:
+                pygame.transform.scale(scene, screen.get_size(), screen)
     
     # Scan Lines
     if random.random() < 0.3:
         scan_y = random.randint(0, WIN_HEIGHT)
         pygame.draw.line(screen, (0, 100, 100), (0, scan_y), (WIN_WIDTH, scan_y), 1)
     
-    pygame.display.flip()
-    clock.tick(60)
+    if LATENCY_OVERLAY:
+        latency_tracker.render_overlay(screen, latency_font)
+    
+    # Only drawing and upscaling depend on the render scale; the simulation and a vsynced flip don't
+    draw_ms = (time.perf_counter() - render_start - simulation_time) * 1000
+    
+    with stage('flip'):
+        pygame.display.flip()
+    latency_tracker.frame_presented()
+    render_scaler.update(draw_ms)
+    if frame_output is not None:
+        with stage('output'):
+            frame_output.write(screen, frame_index - 1)
+    tracer.dump_if_spike((time.perf_counter() - frame_start) * 1000, TRACE_SPIKE_MS)
+    
+    with tracer.span('tick'):
+        clock.tick(idle_monitor.fps)
+    idle_monitor.end_frame()
+    memory.end_frame()
 
+simulation.shutdown()
+scene_builder.shutdown()
+if frame_output is not None:
+    frame_output.close()
+    print(frame_output.report())
+if MEMORY_PROFILE:
+    print(memory.report())
+memory.stop()
 pygame.quit()
-cap.release()
\ No newline at end of file
+cap.release()
+print(idle_monitor.report())
+print(head_tracker.report())
+print(latency_tracker.report())
+if LATENCY_REPORT_PATH:
+    latency_tracker.write_report(LATENCY_REPORT_PATH)
\ No newline at end of file
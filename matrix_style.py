@@ -1,10 +1,16 @@
 import pygame
 import random
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import tracer
 
 class MatrixStream:
     CHARS = list("ｱｲｳｴｵｶｷｸｹｺｻｼｽｾｿﾀﾁﾂﾃﾄﾅﾆﾇﾈﾉﾊﾋﾌﾍﾎﾏﾐﾑﾒﾓﾔﾕﾖﾗﾘﾙﾚﾛﾜﾝ0123456789ABCDEFZ!?")
     
-    def __init__(self, start_point, end_point, trail_length=12, color='cyan'):
+    # Brightness along a trail depends only on its length, so streams share one ramp per length
+    _brightness_ramps = {}
+    
+    def __init__(self, start_point, end_point, trail_length=12, color='cyan', rng=random):
         self.start_point = start_point
         self.end_point = end_point
         self.trail_length = trail_length
@@ -16,7 +22,7 @@ class MatrixStream:
         elif color == 'yellow':
             self.base_color = (255, 255, 0)
         else:
-            choice = random.choice(['cyan', 'magenta', 'yellow'])
+            choice = rng.choice(['cyan', 'magenta', 'yellow'])
             if choice == 'cyan':
                 self.base_color = (0, 255, 255)
             elif choice == 'magenta':
@@ -24,23 +30,43 @@ class MatrixStream:
             else:
                 self.base_color = (255, 255, 0)
         
-        self.progress = random.uniform(-0.3, 0.0)
-        self.speed = random.uniform(0.008, 0.015)
+        self.progress = rng.uniform(-0.3, 0.0)
+        self.speed = rng.uniform(0.008, 0.015)
         self.char_spacing = 0.06
-        self.char_change_probability = random.uniform(0.02, 0.05)
+        self.char_change_probability = rng.uniform(0.02, 0.05)
         
-        self.characters = []
-        for i in range(trail_length):
-            self.characters.append({
-                'char': random.choice(self.CHARS),
-                'brightness': self._calculate_brightness(i)
-            })
+        self.chars = [rng.choice(self.CHARS) for _ in range(trail_length)]
+        self.brightness = self._brightness_ramp(trail_length)
+    
+    def to_spec(self):
+        # Compact, picklable form for building streams in worker processes
+        return (self.start_point, self.end_point, self.trail_length, self.base_color,
+                self.progress, self.speed, self.char_change_probability, ''.join(self.chars))
+    
+    @classmethod
+    def from_spec(cls, spec):
+        stream = cls.__new__(cls)
+        (stream.start_point, stream.end_point, stream.trail_length, stream.base_color,
+         stream.progress, stream.speed, stream.char_change_probability, chars) = spec
+        stream.char_spacing = 0.06
+        stream.chars = list(chars)
+        stream.brightness = cls._brightness_ramp(stream.trail_length)
+        return stream
     
-    def _calculate_brightness(self, index):
+    @classmethod
+    def _brightness_ramp(cls, trail_length):
+        ramp = cls._brightness_ramps.get(trail_length)
+        if ramp is None:
+            ramp = tuple(cls._calculate_brightness(i, trail_length) for i in range(trail_length))
+            cls._brightness_ramps[trail_length] = ramp
+        return ramp
+    
+    @staticmethod
+    def _calculate_brightness(index, trail_length):
         if index == 0:
             return 255
         else:
-            fade = 1.0 - (index / self.trail_length)
+            fade = 1.0 - (index / trail_length)
             return int(50 + (fade * 150))
     
     def _interpolate_point(self, t):
@@ -57,19 +83,19 @@ class MatrixStream:
     def update(self):
         self.progress += self.speed
         
-        for i, char_data in enumerate(self.characters):
+        chars = self.chars
+        for i in range(len(chars)):
             change_prob = self.char_change_probability * (1 + i * 0.3)
             if random.random() < change_prob:
-                char_data['char'] = random.choice(self.CHARS)
+                chars[i] = random.choice(self.CHARS)
     
     def reset(self):
         self.progress = -0.3
         self.speed = random.uniform(0.008, 0.015)
         self.char_change_probability = random.uniform(0.02, 0.05)
         
-        for i, char_data in enumerate(self.characters):
-            char_data['char'] = random.choice(self.CHARS)
-            char_data['brightness'] = self._calculate_brightness(i)
+        for i in range(len(self.chars)):
+            self.chars[i] = random.choice(self.CHARS)
     
     def get_characters(self):
         characters = []
@@ -82,8 +108,7 @@ class MatrixStream:
             
             x, y, z = self._interpolate_point(char_progress)
             
-            char_data = self.characters[i]
-            characters.append((x, y, z, char_data['char'], char_data['brightness']))
+            characters.append((x, y, z, self.chars[i], self.brightness[i]))
         
         return characters
     
@@ -94,65 +119,100 @@ class MatrixStream:
         return self.base_color
 
 
+# Share of the streams on each surface, and the number of jobs it is built in,
+# so every job covers about a tenth of the streams
+STREAM_SECTIONS = [
+    ('floor', 0.4, 4),
+    ('ceiling', 0.4, 4),
+    ('left', 0.1, 1),
+    ('right', 0.1, 1)
+]
+STREAM_JOBS = sum(parts for _, _, parts in STREAM_SECTIONS)
+
+def stream_jobs(num_streams, bounds, color_mode):
+    # Split stream construction into independent, seeded jobs
+    jobs = []
+    for section, share, parts in STREAM_SECTIONS:
+        count = int(num_streams * share)
+        for part in range(parts):
+            size = count * (part + 1) // parts - count * part // parts
+            if size:
+                jobs.append((section, size, bounds, color_mode, random.getrandbits(32)))
+    return jobs
+
+def build_stream_specs(job):
+    # Runs in a worker: builds one section's streams and returns them in compact form
+    section, count, bounds, color_mode, seed = job
+    rng = random.Random(seed)
+    min_x, max_x, min_y, max_y, min_z, max_z = bounds
+    
+    color_pool = ['cyan'] * 40 + ['magenta'] * 35 + ['yellow'] * 25
+    
+    specs = []
+    for _ in range(count):
+        if section == 'floor':
+            x = rng.uniform(min_x, max_x)
+            start, end = (x, min_y, min_z), (x, min_y, max_z)
+        elif section == 'ceiling':
+            x = rng.uniform(min_x, max_x)
+            start, end = (x, max_y, min_z), (x, max_y, max_z)
+        elif section == 'left':
+            y = rng.uniform(min_y, max_y)
+            start, end = (min_x, y, min_z), (min_x, y, max_z)
+        else:
+            y = rng.uniform(min_y, max_y)
+            start, end = (max_x, y, min_z), (max_x, y, max_z)
+        
+        trail_length = rng.randint(10, 18)
+        color = rng.choice(color_pool) if color_mode == 'random' else color_mode
+        specs.append(MatrixStream(start, end, trail_length, color, rng).to_spec())
+    
+    return specs
+
+
 class MatrixRainSystem:
     BASE_FONT_SIZE = 20
     NEAR_Z = 0.0
     FAR_Z = 15.0
     MIN_FONT_SIZE = 8
     MAX_FONT_SIZE = 60
+    GLYPH_CACHE_LIMIT = 8000
     
-    def __init__(self, num_streams=400, bounds=(-10, 10, -8, 8, 0, 15), color='random'):
+    def __init__(self, num_streams=400, bounds=(-10, 10, -8, 8, 0, 15), color='random', render_bands=0, builder=None):
         self.bounds = bounds
         self.num_streams = num_streams
         self.color_mode = color
+        self.builder = builder
         self._init_streams()
         
+        # Optional tiled rasterization: horizontal bands blitted in parallel, since blits release the GIL.
+        # SDL keeps one blit map per source surface, so each band blits its own copies of the glyphs.
+        self.render_bands = render_bands
+        self.band_executor = None
+        self.band_glyphs = [{} for _ in range(render_bands)]
+        if render_bands > 1:
+            self.band_executor = ThreadPoolExecutor(max_workers=render_bands, thread_name_prefix='rain-band')
+        
+        # Offscreen render resolution relative to the display; fonts and culling scale with it
+        self.render_scale = 1.0
+        
         self.font_cache = {}
         self._init_font_cache()
+        
+        # Rendered glyphs are independent of head position, so every viewport shares them
+        self.glyph_cache = {}
     
     def _init_streams(self):
         """Initialize streams with cyberpunk colors"""
-        self.streams = []
-        min_x, max_x, min_y, max_y, min_z, max_z = self.bounds
-        
-        color_pool = ['cyan'] * 40 + ['magenta'] * 35 + ['yellow'] * 25
-        
-        # Floor streams
-        for _ in range(int(self.num_streams * 0.4)):
-            x = random.uniform(min_x, max_x)
-            start = (x, min_y, min_z)
-            end = (x, min_y, max_z)
-            trail_length = random.randint(10, 18)
-            color = random.choice(color_pool) if self.color_mode == 'random' else self.color_mode
-            self.streams.append(MatrixStream(start, end, trail_length, color))
-        
-        # Ceiling streams
-        for _ in range(int(self.num_streams * 0.4)):
-            x = random.uniform(min_x, max_x)
-            start = (x, max_y, min_z)
-            end = (x, max_y, max_z)
-            trail_length = random.randint(10, 18)
-            color = random.choice(color_pool) if self.color_mode == 'random' else self.color_mode
-            self.streams.append(MatrixStream(start, end, trail_length, color))
-        
-        # Left wall streams
-        for _ in range(int(self.num_streams * 0.1)):
-            y = random.uniform(min_y, max_y)
-            start = (min_x, y, min_z)
-            end = (min_x, y, max_z)
-            trail_length = random.randint(10, 18)
-            color = random.choice(color_pool) if self.color_mode == 'random' else self.color_mode
-            self.streams.append(MatrixStream(start, end, trail_length, color))
-        
-        # Right wall streams
-        for _ in range(int(self.num_streams * 0.1)):
-            y = random.uniform(min_y, max_y)
-            start = (max_x, y, min_z)
-            end = (max_x, y, max_z)
-            trail_length = random.randint(10, 18)
-            color = random.choice(color_pool) if self.color_mode == 'random' else self.color_mode
-            self.streams.append(MatrixStream(start, end, trail_length, color))
+        jobs = stream_jobs(self.num_streams, self.bounds, self.color_mode)
+        
+        # Independent jobs, run on the scene builder's pool when there is one
+        if self.builder is not None:
+            results = self.builder.map(build_stream_specs, jobs)
+        else:
+            results = map(build_stream_specs, jobs)
         
+        self.streams = [MatrixStream.from_spec(spec) for specs in results for spec in specs]
         self.streams.sort(key=lambda s: (s.start_point[2] + s.end_point[2]) / 2, reverse=True)
     
     def update_bounds(self, new_bounds):
@@ -183,26 +243,46 @@ class MatrixRainSystem:
             except:
                 font_path = None
         
+        self.font_path = font_path
         for size in range(self.MIN_FONT_SIZE, self.MAX_FONT_SIZE + 1, 2):
-            try:
-                if font_path and font_path.endswith('.ttc'):
-                    self.font_cache[size] = pygame.font.Font(font_path, size)
-                elif font_path:
-                    self.font_cache[size] = pygame.font.SysFont(font_path, size)
-                else:
-                    self.font_cache[size] = pygame.font.Font(None, size)
-            except:
-                self.font_cache[size] = pygame.font.Font(None, size)
+            self.font_cache[size] = self._load_font(size)
+    
+    def _load_font(self, size):
+        font_path = self.font_path
+        try:
+            if font_path and font_path.endswith('.ttc'):
+                return pygame.font.Font(font_path, size)
+            elif font_path:
+                return pygame.font.SysFont(font_path, size)
+            else:
+                return pygame.font.Font(None, size)
+        except:
+            return pygame.font.Font(None, size)
     
     def _get_font_for_size(self, size):
-        clamped_size = max(self.MIN_FONT_SIZE, min(self.MAX_FONT_SIZE, size))
+        min_size = max(4, int(self.MIN_FONT_SIZE * self.render_scale))
+        max_size = int(self.MAX_FONT_SIZE * self.render_scale)
+        clamped_size = max(min_size, min(max_size, size))
         rounded_size = round(clamped_size / 2) * 2
         
+        # Sizes outside the preloaded range are only needed at reduced render scales
         if rounded_size not in self.font_cache:
-            rounded_size = self.BASE_FONT_SIZE
+            self.font_cache[rounded_size] = self._load_font(rounded_size)
         
         return self.font_cache[rounded_size]
     
+    def _get_glyph(self, font, char, colour):
+        key = (font, char, colour)
+        glyph = self.glyph_cache.get(key)
+        if glyph is None:
+            if len(self.glyph_cache) >= self.GLYPH_CACHE_LIMIT:
+                self.glyph_cache.clear()
+                for cache in self.band_glyphs:
+                    cache.clear()
+            glyph = font.render(char, True, colour)
+            self.glyph_cache[key] = glyph
+        return glyph
+    
     def _calculate_scale_factor(self, z):
         z_normalized = (z - self.NEAR_Z) / (self.FAR_Z - self.NEAR_Z)
         z_normalized = max(0.0, min(1.0, z_normalized))
@@ -221,18 +301,75 @@ class MatrixRainSystem:
             if stream.is_finished():
                 stream.reset()
     
-    def render(self, screen, project_func, hx, hy, width, height):
-        for stream in self.streams:
-            base_color = stream.get_base_color()
-            
-            for x, y, z, char, brightness in stream.get_characters():
+    def snapshot(self):
+        # Everything render needs, detached from the live streams
+        return [(stream.get_base_color(), stream.get_characters()) for stream in self.streams]
+    
+    def render(self, screen, project_func, hx, hy, width, height, state=None):
+        if state is None:
+            state = self.snapshot()
+        
+        with tracer.span('rain.project'):
+            glyphs = self._project_glyphs(state, project_func, hx, hy, width, height)
+        
+        with tracer.span('rain.blit', glyphs=len(glyphs)):
+            if self.band_executor is not None:
+                self._blit_banded(screen, glyphs)
+            else:
+                screen.blits(glyphs, doreturn=False)
+    
+    def _blit_banded(self, screen, glyphs):
+        width, height = screen.get_size()
+        band_height = -(-height // self.render_bands)
+        
+        # Bin glyphs by band; one straddling an edge goes in both and each copy is clipped to its band
+        bins = [[] for _ in range(self.render_bands)]
+        for surface, (x, y) in glyphs:
+            first = max(0, y // band_height)
+            last = min(self.render_bands - 1, (y + surface.get_height() - 1) // band_height)
+            for band in range(first, last + 1):
+                bins[band].append((self._band_glyph(band, surface), (x, y - band * band_height)))
+        
+        jobs = []
+        for band, items in enumerate(bins):
+            top = band * band_height
+            if not items or top >= height:
+                continue
+            rect = pygame.Rect(0, top, width, min(band_height, height - top))
+            jobs.append(self.band_executor.submit(self._blit_band, screen.subsurface(rect), items))
+        
+        for job in jobs:
+            job.result()
+    
+    def _band_glyph(self, band, glyph):
+        # Copies are made here on the render thread, while no band is blitting
+        cache = self.band_glyphs[band]
+        copy = cache.get(glyph)
+        if copy is None:
+            if len(cache) >= self.GLYPH_CACHE_LIMIT:
+                cache.clear()
+            copy = glyph.copy()
+            cache[glyph] = copy
+        return copy
+    
+    def _blit_band(self, band_surface, items):
+        with tracer.span('rain.band', glyphs=len(items)):
+            band_surface.blits(items, doreturn=False)
+    
+    def _project_glyphs(self, state, project_func, hx, hy, width, height):
+        # Visible glyphs as (surface, top-left) pairs ready for blitting
+        glyphs = []
+        margin = 50 * self.render_scale
+        
+        for base_color, characters in state:
+            for x, y, z, char, brightness in characters:
                 px, py = project_func(x, y, z, hx, hy, width, height)
                 
-                if px < -50 or px > width + 50 or py < -50 or py > height + 50:
+                if px < -margin or px > width + margin or py < -margin or py > height + margin:
                     continue
                 
                 scale_factor = self._calculate_scale_factor(z)
-                font_size = int(self.BASE_FONT_SIZE * scale_factor)
+                font_size = int(self.BASE_FONT_SIZE * scale_factor * self.render_scale)
                 font = self._get_font_for_size(font_size)
                 
                 final_brightness = self._calculate_depth_brightness(brightness, z)
@@ -245,8 +382,11 @@ class MatrixRainSystem:
                 )
                 
                 try:
-                    text_surface = font.render(char, True, colour)
-                    char_rect = text_surface.get_rect(center=(px, py))
-                    screen.blit(text_surface, char_rect)
+                    text_surface = self._get_glyph(font, char, colour)
                 except:
-                    pass
\ No newline at end of file
+                    continue
+                
+                glyph_width, glyph_height = text_surface.get_size()
+                glyphs.append((text_surface, (px - glyph_width // 2, py - glyph_height // 2)))
+        
+        return glyphs
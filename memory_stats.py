@@ -0,0 +1,176 @@
+import gc
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pygame
+
+def current_rss():
+    # Resident set size in bytes, or None where /proc is unavailable
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except:
+        return None
+
+def count_surfaces():
+    # Surfaces aren't tracked by the GC themselves, so find them through the containers holding them
+    seen = set()
+    count = 0
+    total_bytes = 0
+    for obj in gc.get_objects():
+        for ref in gc.get_referents(obj):
+            if isinstance(ref, pygame.Surface) and id(ref) not in seen:
+                seen.add(id(ref))
+                count += 1
+                # Subsurfaces share their parent's pixels
+                if ref.get_parent() is None:
+                    total_bytes += ref.get_pitch() * ref.get_height()
+    return count, total_bytes
+
+
+class MemoryMonitor:
+    """Per-frame allocation, GC pause and Surface statistics, plus optional GC scheduling
+
+    With trace=True, tracemalloc measures net and peak allocation inside each
+    section() of the frame. With gc_mode='frame', automatic collection is
+    switched off, startup objects are frozen, and collections only run at
+    end_frame(): the young generation every frame and a full collection
+    every full_collect_interval frames.
+    """
+
+    def __init__(self, trace=False, gc_mode='auto', report_interval=600, full_collect_interval=600):
+        self.trace = trace
+        self.gc_mode = gc_mode
+        self.report_interval = report_interval
+        self.full_collect_interval = full_collect_interval
+
+        self.frames = 0
+        self.sections = {}
+
+        self.gc_pauses = {0: [], 1: [], 2: []}
+        self.frame_gc_pauses = 0
+        self.frames_with_gc = 0
+        self._gc_start = None
+        self._controlled_gc = False
+        gc.callbacks.append(self._on_gc)
+
+        self.previous_snapshot = None
+        self.start_rss = current_rss()
+
+        if trace:
+            tracemalloc.start()
+
+    def start_frames(self):
+        # Call once the scene is built, before the first frame
+        if self.gc_mode == 'frame':
+            gc.collect()
+            gc.freeze()
+            gc.disable()
+            self.gc_pauses = {0: [], 1: [], 2: []}
+            self.frame_gc_pauses = 0
+
+        # Growth is reported relative to the built scene
+        if self.trace:
+            self.previous_snapshot = self._take_snapshot()
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            self.gc_pauses[info['generation']].append(time.perf_counter() - self._gc_start)
+            # Collections end_frame() runs itself happen between frames, not inside one
+            if not self._controlled_gc:
+                self.frame_gc_pauses += 1
+            self._gc_start = None
+
+    @contextmanager
+    def section(self, name):
+        if not self.trace:
+            yield
+            return
+
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            end, peak = tracemalloc.get_traced_memory()
+            stats = self.sections.setdefault(name, {'net': 0, 'peak': 0, 'worst_peak': 0})
+            stats['net'] += end - start
+            stats['peak'] += peak - start
+            stats['worst_peak'] = max(stats['worst_peak'], peak - start)
+
+    def end_frame(self):
+        self.frames += 1
+
+        if self.frame_gc_pauses:
+            self.frames_with_gc += 1
+        self.frame_gc_pauses = 0
+
+        # Controlled collection points, outside of any frame's drawing
+        if self.gc_mode == 'frame':
+            self._controlled_gc = True
+            try:
+                if self.frames % self.full_collect_interval == 0:
+                    gc.collect()
+                else:
+                    gc.collect(0)
+            finally:
+                self._controlled_gc = False
+
+        if self.report_interval and self.frames % self.report_interval == 0:
+            print(self.report())
+
+    def report(self, top=8):
+        lines = [f"Memory report after {self.frames} frames (gc mode: {self.gc_mode}):"]
+
+        # Sections may run several times a frame, once per viewport
+        frames = max(1, self.frames)
+        for name, stats in self.sections.items():
+            lines.append(
+                f"  {name:<12} net {stats['net'] / frames / 1024:8.1f} KiB/frame  "
+                f"peak {stats['peak'] / frames / 1024:8.1f} KiB/frame  "
+                f"worst {stats['worst_peak'] / 1024:8.1f} KiB"
+            )
+
+        for generation, pauses in self.gc_pauses.items():
+            if pauses:
+                lines.append(
+                    f"  gc gen {generation}     {len(pauses):6d} pauses  "
+                    f"mean {sum(pauses) / len(pauses) * 1000:6.2f} ms  max {max(pauses) * 1000:6.2f} ms"
+                )
+        lines.append(f"  frames with a gc pause: {self.frames_with_gc}")
+
+        count, surface_bytes = count_surfaces()
+        lines.append(f"  surfaces    {count:6d} reachable, {surface_bytes / 1024 / 1024:.1f} MiB of pixels")
+
+        rss = current_rss()
+        if rss is not None and self.start_rss is not None:
+            lines.append(f"  rss         {rss / 1024 / 1024:.1f} MiB ({(rss - self.start_rss) / 1024 / 1024:+.1f} MiB since start)")
+
+        if self.trace:
+            # Where memory grew since the last report, by source line
+            snapshot = self._take_snapshot()
+            if self.previous_snapshot is not None:
+                lines.append("  top growth since last report:")
+                for stat in snapshot.compare_to(self.previous_snapshot, 'lineno')[:top]:
+                    lines.append(f"    {stat}")
+            self.previous_snapshot = snapshot
+
+        return "\n".join(lines)
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")
+        ])
+
+    def stop(self):
+        if self.gc_mode == 'frame':
+            gc.enable()
+            gc.unfreeze()
+        gc.callbacks.remove(self._on_gc)
+        if self.trace:
+            tracemalloc.stop()
@@ -0,0 +1,54 @@
+class RenderScaler:
+    """Chooses the offscreen render resolution, either fixed or adapted to frame time
+
+    The scene is drawn at scale times the display resolution and upscaled once
+    per frame. In dynamic mode the scale steps down when the smoothed render
+    time exceeds the target and back up when there is comfortable headroom.
+    Scales are quantised so font and sprite caches get reused.
+    """
+
+    STEP = 0.05
+
+    def __init__(self, scale=1.0, dynamic=False, target_ms=1000 / 60, min_scale=0.5, settle_frames=30):
+        self.max_scale = scale
+        self.scale = scale
+        self.dynamic = dynamic
+        self.target_ms = target_ms
+        self.min_scale = min_scale
+        self.settle_frames = settle_frames
+
+        self.average_ms = None
+        self.frames_since_change = 0
+
+    def scene_size(self, width, height):
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
+
+    def update(self, render_ms):
+        # Feed the time spent drawing the last frame; returns True when the scale changed
+        if not self.dynamic:
+            return False
+
+        if self.average_ms is None:
+            self.average_ms = render_ms
+        else:
+            self.average_ms = self.average_ms * 0.9 + render_ms * 0.1
+
+        self.frames_since_change += 1
+        if self.frames_since_change < self.settle_frames:
+            return False
+
+        scale = self.scale
+        if self.average_ms > self.target_ms * 0.9:
+            # Fill cost falls with the square of the scale
+            scale = max(self.min_scale, scale - 2 * self.STEP)
+        elif self.average_ms < self.target_ms * 0.6:
+            scale = min(self.max_scale, scale + self.STEP)
+
+        scale = round(scale / self.STEP) * self.STEP
+        if abs(scale - self.scale) < 1e-6:
+            return False
+
+        self.scale = scale
+        self.frames_since_change = 0
+        self.average_ms = None
+        return True
@@ -0,0 +1,57 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from tracing import tracer
+
+class SceneBuilder:
+    """Runs independent scene construction jobs on a worker pool
+
+    map() spreads pure-Python jobs (stream and plane generation) over worker
+    processes and returns their results in order; jobs must be picklable
+    module-level functions. Processes are forked, so the pool has to be
+    created before pygame, the camera and the landmarker start their own
+    threads. Where fork is unavailable, or with kind='thread', map() falls
+    back to threads. map_threads() always uses threads, for jobs that touch
+    pygame objects such as pre-rendering sprites.
+    """
+
+    DEFAULT_WORKERS = 4
+
+    def __init__(self, workers=None, kind='process', max_jobs=None):
+        # More workers than cores or than the largest batch of jobs would only cost fork time
+        workers = min(workers or self.DEFAULT_WORKERS, multiprocessing.cpu_count())
+        if max_jobs:
+            workers = min(workers, max_jobs)
+        self.workers = max(1, workers)
+        self.kind = kind
+
+        self._processes = None
+        if kind == 'process' and self.workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            self._processes = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            # Fork every worker now, while this is still a single threaded process
+            list(self._processes.map(int, range(self.workers)))
+
+        self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scene-builder')
+
+    def map(self, fn, jobs):
+        jobs = list(jobs)
+        with tracer.span('scene_builder.map', job=fn.__name__, jobs=len(jobs)):
+            if len(jobs) <= 1:
+                return [fn(job) for job in jobs]
+            if self._processes is not None:
+                return list(self._processes.map(fn, jobs))
+            return list(self._threads.map(fn, jobs))
+
+    def map_threads(self, fn, jobs):
+        jobs = list(jobs)
+        with tracer.span('scene_builder.map_threads', job=fn.__name__, jobs=len(jobs)):
+            if len(jobs) <= 1:
+                return [fn(job) for job in jobs]
+            return list(self._threads.map(fn, jobs))
+
+    def shutdown(self):
+        if self._processes is not None:
+            self._processes.shutdown()
+            self._processes = None
+        self._threads.shutdown()
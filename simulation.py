@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import tracer
+
+class Simulation:
+    """Steps the scene systems and hands the renderer consistent snapshots
+
+    In threaded mode the update for frame N+1 runs on a worker thread while
+    frame N is drawn, flipped and waits on the clock. Each system's live
+    state belongs to the worker; the renderer only ever reads the snapshot
+    returned by wait(), which is double-buffered against the next update.
+    """
+
+    def __init__(self, systems, bounded_systems=(), threaded=True):
+        self.systems = systems
+        self.bounded_systems = bounded_systems
+        self.threaded = threaded
+
+        self._pending_bounds = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='simulation') if threaded else None
+        self._future = None
+
+        # Front buffer for the first frame
+        self._states = [system.snapshot() for system in systems]
+
+    def set_bounds(self, bounds):
+        # Applied on the update thread before the next step
+        self._pending_bounds = bounds
+
+    def _step(self, steps):
+        with tracer.span('simulation.step', steps=steps):
+            bounds = self._pending_bounds
+            if bounds is not None:
+                self._pending_bounds = None
+                for system in self.bounded_systems:
+                    system.update_bounds(bounds)
+
+            for _ in range(steps):
+                for system in self.systems:
+                    with tracer.span('simulation.update', system=type(system).__name__):
+                        system.update()
+
+            with tracer.span('simulation.snapshot'):
+                return [system.snapshot() for system in self.systems]
+
+    def start(self, steps=1):
+        # Begin computing the next frame's state, advancing the scene by `steps` fixed updates
+        if self.threaded:
+            self._future = self._executor.submit(self._step, steps)
+        else:
+            self._states = self._step(steps)
+
+    def wait(self):
+        # Swap in the most recently completed state
+        if self._future is not None:
+            self._states = self._future.result()
+            self._future = None
+        return self._states
+
+    def shutdown(self):
+        if self._executor is not None:
+            self.wait()
+            self._executor.shutdown()
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+class Tracer:
+    """Opt-in span recorder that exports Chrome trace JSON
+
+    Spans are kept in a fixed-size ring buffer, so tracing can stay on for a
+    whole session and be dumped when something interesting happens. Open the
+    files in Perfetto (ui.perfetto.dev) or chrome://tracing. Each thread gets
+    its own lane, named after the Python thread.
+    """
+
+    def __init__(self, enabled=False, capacity=200000):
+        self.enabled = enabled
+        self.events = deque(maxlen=capacity)
+        self.thread_names = {}
+        self.pid = os.getpid()
+        self._null = nullcontext()
+        self._last_spike_dump = 0.0
+        self._frame_start = None
+        self._frame_index = None
+
+    def _now_us(self):
+        return time.perf_counter_ns() / 1000.0
+
+    def _thread_id(self):
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        return tid
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return self._null
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            event = {
+                'name': name,
+                'ph': 'X',
+                'ts': start,
+                'dur': self._now_us() - start,
+                'pid': self.pid,
+                'tid': self._thread_id()
+            }
+            if args:
+                event['args'] = args
+            self.events.append(event)
+
+    def begin_frame(self, index):
+        # Closes the previous frame's span and drops a global marker across every lane
+        if not self.enabled:
+            self._frame_start = None
+            return
+
+        now = self._now_us()
+        tid = self._thread_id()
+        if self._frame_start is not None:
+            self.events.append({
+                'name': 'frame',
+                'ph': 'X',
+                'ts': self._frame_start,
+                'dur': now - self._frame_start,
+                'pid': self.pid,
+                'tid': tid,
+                'args': {'index': self._frame_index}
+            })
+        self.events.append({'name': f'frame {index}', 'ph': 'i', 's': 'g', 'ts': now, 'pid': self.pid, 'tid': tid})
+        self._frame_start = now
+        self._frame_index = index
+
+    def dump(self, path):
+        # Snapshot the ring here; serialising a full buffer takes about a second, so it's written in the background
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+            for tid, name in list(self.thread_names.items())
+        ]
+        events = metadata + list(self.events)
+        threading.Thread(target=self._write, args=(path, events, len(events) - len(metadata)), name='trace-writer').start()
+        return path
+
+    def _write(self, path, events, count):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"Trace with {count} events written to {path}")
+
+    def dump_if_spike(self, frame_ms, threshold_ms, directory='.', cooldown=5.0):
+        # Save the buffer leading up to a slow frame, at most once per cooldown
+        if not self.enabled or threshold_ms is None or frame_ms <= threshold_ms:
+            return None
+
+        now = time.perf_counter()
+        if now - self._last_spike_dump < cooldown:
+            return None
+        self._last_spike_dump = now
+
+        name = time.strftime('trace_spike_%Y%m%d_%H%M%S') + f'_{frame_ms:.0f}ms.json'
+        return self.dump(os.path.join(directory, name))
+
+
+# Shared by every module; main.py decides whether it records
+tracer = Tracer()